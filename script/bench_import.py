@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+#################################################
+### startup-time benchmark of the decoder core
+### imports the core modules in fresh interpreters and fails (exit code 1) if the
+### median import time exceeds the limit or if NumPy / gps_time are loaded eagerly
+###     python script/bench_import.py --runs 10 --limit-ms 50
+#################################################
+
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+CORE_MODULES = (
+    'sbf_decoder.sbf_decoder',
+    'sbf_decoder.body_parser',
+    'sbf_decoder.reader',
+    'sbf_decoder.decimate',
+)
+
+# modules the core must not import
+HEAVY_MODULES = ('numpy', 'gps_time')
+
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measureImport(modules=CORE_MODULES):
+    """ import time in milliseconds and the heavy modules loaded, in a fresh interpreter """
+    code = PROBE.format(imports='\n'.join(f'import {m}' for m in modules), heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    result = json.loads(out)
+    return result['ms'], result['loaded']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='decoder core import time benchmark')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--limit-ms', type=float, default=50.0, help='max median import time')
+    args = parser.parse_args(argv)
+
+    times = []
+    loaded = set()
+    for _ in range(args.runs):
+        ms, heavy = measureImport()
+        times.append(ms)
+        loaded.update(heavy)
+
+    median = statistics.median(times)
+    print(f'core import: median {median:.1f} ms, min {min(times):.1f} ms, max {max(times):.1f} ms '
+          f'over {args.runs} runs (limit {args.limit_ms:.0f} ms)')
+
+    ok = True
+    if loaded:
+        print(f'FAIL: core imports {sorted(loaded)}')
+        ok = False
+    if median > args.limit_ms:
+        print('FAIL: import time over the limit')
+        ok = False
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
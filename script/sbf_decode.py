@@ -5,61 +5,8 @@
 '''
 
 from sbf_decoder.sbf_decoder import sbfDecoder
-import struct
-import socket
-
-#################################################
-### decode sbf data streaming
-#################################################
-def readSbfDataStream(ip:str, port:int):
-    """
-    decode the sensor data stream
-
-    :param ip: device ip
-    :param port: sbf streaming port
-    :return: generator; sbf-blockname + sbf-block dictionary
-    """
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_address = (ip, port)
-
-    # bind(): local
-    # connect(): remote
-    s.connect(server_address)
-
-    while True:
-        msg, address = s.recvfrom(1024*2)
-        for name, data in sbfDecoder(msg,True):
-            yield name, data
-
-
-#################################################
-### decode .sbf log file
-#################################################
-def readSbfLogFile(filename):
-    """
-    decode a sbf log file
-    :param filename: .sbf log file
-    :return: generator; sbf-blockname + sbf-block dictionary
-    """
-    with open(filename, 'rb') as f:
-        """DON'T REMOVE NEWLINE CHARACTERS"""
-        b_array = bytearray(f.read())
-
-    while True:
-
-        # header length: 8 bytes
-        if len(b_array) <= 8:
-            print('\n', "DON'T FIND HEADER")
-            break
-
-        # read log file, offline
-        for blockname, block_dict in sbfDecoder(b_array, is_online=False):
-            header_fields = struct.unpack('<HHHH', b_array[:8])
-            msg_len = header_fields[-1]
-
-            del b_array[:msg_len]
-
-            yield blockname, block_dict
+# readSbfDataStream / readSbfLogFile live in sbf_decoder.reader
+from sbf_decoder.reader import readSbfDataStream, readSbfLogFile
 
 
 if __name__ == "__main__":
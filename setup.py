@@ -13,5 +13,14 @@ setup(
     version='0.1',
     packages=find_packages("src"),
     package_dir={"": "src"},
-    install_requires=['gps-time', 'numpy'],
+    install_requires=['numpy'],
+    extras_require={'h5': ['h5py']},
+    entry_points={
+        'console_scripts': [
+            'sbf-export=sbf_decoder.export:main',
+            'sbf-convert=sbf_decoder.convert:main',
+            'sbf-replay=sbf_decoder.replay:main',
+            'sbf-broker=sbf_decoder.broker:main',
+        ],
+    },
 )
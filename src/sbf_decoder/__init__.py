@@ -1,3 +1,5 @@
 # -*- coding: UTF-8 -*-
 # import src.sb1_software.utilities.blocks
-# import src.sb1_software.utilities.sbf_decoder
\ No newline at end of file
+# import src.sb1_software.utilities.sbf_decoder
+
+__version__ = '0.1'
@@ -0,0 +1,158 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+from sbf_decoder.columns import blocksToColumns, blockTimes
+
+ALIGN_MODES = ('nearest', 'previous', 'linear')
+
+
+def _sortedByTime(times: np.ndarray, columns: dict):
+    """ sort times and columns by time if needed (stable) """
+    if times.size > 1 and np.any(times[1:] < times[:-1]):
+        order = np.argsort(times, kind='stable')
+        return times[order], {k: v[order] for k, v in columns.items()}
+    return times, columns
+
+
+def _alignIndex(ref_times: np.ndarray, src_times: np.ndarray, mode: str):
+    """
+    index of the source sample for every reference time, -1 if there is none
+
+    :return: int64 array of indexes into src_times
+    """
+    n = src_times.size
+    idx = np.searchsorted(src_times, ref_times, side='right') - 1
+
+    if mode == 'previous' or n == 0:
+        return idx
+
+    # nearest: compare the previous and the next sample
+    nxt = np.minimum(idx + 1, n - 1)
+    prev = np.maximum(idx, 0)
+    use_next = (idx < 0) | (np.abs(src_times[nxt] - ref_times) < np.abs(ref_times - src_times[prev]))
+
+    return np.where(use_next, nxt, prev)
+
+
+def _takeColumn(values: np.ndarray, idx: np.ndarray, invalid: np.ndarray):
+    """ take values[idx], invalid positions become nan / '' """
+    out = values[np.maximum(idx, 0)] if values.size else np.empty(idx.size, dtype=values.dtype)
+
+    if invalid.any():
+        if out.dtype.kind in 'iub':
+            out = out.astype(np.float64)
+        if out.dtype.kind in 'US':
+            out[invalid] = ''
+        else:
+            out[invalid] = np.nan
+
+    return out
+
+
+def alignColumns(ref_times, src_times, src_columns: dict, mode='nearest', tolerance=None):
+    """
+    align the source columns onto the reference times
+
+    Numeric columns containing nan (e.g. ExtSensorMeas blocks without an
+    acceleration sub-block) are aligned using their valid samples only.
+
+    :param ref_times: reference times in milliseconds
+    :param src_times: source times in milliseconds
+    :param src_columns: {column: np.ndarray} sampled at src_times
+    :param mode: 'nearest', 'previous' or 'linear'
+    :param tolerance: max distance in milliseconds to the used source sample(s),
+                      farther reference times get nan; None for no limit
+    :return: {column: np.ndarray} with len(ref_times) rows
+    """
+    if mode not in ALIGN_MODES:
+        raise ValueError(f"unknown align mode '{mode}', choose from {ALIGN_MODES}")
+
+    ref_times = np.asarray(ref_times, dtype=np.float64)
+    src_times, src_columns = _sortedByTime(np.asarray(src_times, dtype=np.float64), src_columns)
+
+    cache = {}
+    aligned = {}
+    for key, values in src_columns.items():
+        values = np.asarray(values)
+        times = src_times
+
+        if values.dtype.kind == 'f':
+            valid = ~np.isnan(values)
+            if not valid.all():
+                times, values = times[valid], values[valid]
+
+        if mode == 'linear' and values.dtype.kind in 'iuf':
+            aligned[key] = _interpColumn(ref_times, times, values, tolerance)
+            continue
+
+        # columns without nan share the index computation on the full time axis
+        shared = times is src_times
+        if shared and 'idx' in cache:
+            idx, invalid = cache['idx']
+        else:
+            idx = _alignIndex(ref_times, times, 'previous' if mode == 'linear' else mode)
+            invalid = idx < 0
+            if times.size and tolerance is not None:
+                invalid |= np.abs(times[np.maximum(idx, 0)] - ref_times) > tolerance
+            if shared:
+                cache['idx'] = idx, invalid
+
+        aligned[key] = _takeColumn(values, idx, invalid)
+
+    return aligned
+
+
+def _interpColumn(ref_times, times, values, tolerance):
+    """ linear interpolation, nan outside of the source time span """
+    if times.size == 0:
+        return np.full(ref_times.size, np.nan)
+
+    out = np.interp(ref_times, times, values.astype(np.float64), left=np.nan, right=np.nan)
+
+    if tolerance is not None:
+        right = np.searchsorted(times, ref_times, side='left')
+        left = np.maximum(right - 1, 0)
+        right = np.minimum(right, times.size - 1)
+        gap = np.maximum(np.abs(ref_times - times[left]), np.abs(times[right] - ref_times))
+        out[gap > tolerance] = np.nan
+
+    return out
+
+
+def alignBlockStreams(blocks, reference='INSNavGeod', others=('ExtSensorMeas',),
+                      mode='nearest', time_key='ts', tolerance=None):
+    """
+    align one or more block streams onto the epochs of a reference block stream,
+    e.g. attach the ExtSensorMeas IMU samples to every INSNavGeod epoch
+
+    :param blocks: iterable of (blockname, block_dict), e.g. sbfDecoder output
+    :param reference: block name of the reference stream
+    :param others: block names to align onto the reference epochs
+    :param mode: 'nearest', 'previous' or 'linear'
+    :param time_key: 'ts' (unix epoch in ms) or 'gps' (WNc + TOW)
+    :param tolerance: max time distance in milliseconds, see alignColumns
+    :return: {'time': reference times, reference: columns, <other>: aligned columns}
+    """
+    if isinstance(others, str):
+        others = (others,)
+
+    block_columns = blocksToColumns(blocks, blocknames={reference, *others})
+    if reference not in block_columns:
+        raise KeyError(f"no '{reference}' block found")
+
+    ref_times = blockTimes(block_columns[reference], time_key)
+    ref_times, ref_columns = _sortedByTime(ref_times, block_columns[reference])
+
+    result = {'time': ref_times, reference: ref_columns}
+    for blockname in others:
+        if blockname == reference:
+            continue
+        src_columns = block_columns.get(blockname, {})
+        src_times = blockTimes(src_columns, time_key) if src_columns else np.empty(0)
+        result[blockname] = alignColumns(ref_times, src_times, src_columns, mode=mode, tolerance=tolerance)
+
+    return result
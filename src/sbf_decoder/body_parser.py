@@ -4,8 +4,8 @@
 @Date    ：03/04/2023 12:05 PM 
 '''
 
+import math
 import struct
-import numpy as np
 
 # INSNavCart datum
 Datum = (
@@ -337,7 +337,7 @@ def insNavSubParser(bit_index: int, bit_char: str, body_array: bytearray):
 
     if int(bit_char) == 0:
         # the bit value is zero
-        sb_dict[sb_name] = np.nan
+        sb_dict[sb_name] = math.nan
         return sb_dict
     else:
         sb_dict[sb_name] = struct.unpack('<fff', body_array[:12])
@@ -381,11 +381,11 @@ def insNavGeodParser(msg_body: bytes):
     del body_array[:2]
 
     # Latitude; f8; double 8 bytes
-    ins_nav_geo['Latitude'] = np.degrees(struct.unpack('<d', body_array[:8])[0])
+    ins_nav_geo['Latitude'] = math.degrees(struct.unpack('<d', body_array[:8])[0])
     del body_array[:8]
 
     # Longitude; f8
-    ins_nav_geo['Longitude'] = np.degrees(struct.unpack('<d', body_array[:8])[0])
+    ins_nav_geo['Longitude'] = math.degrees(struct.unpack('<d', body_array[:8])[0])
     del body_array[:8]
 
     # Height; f8
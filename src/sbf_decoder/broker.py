@@ -0,0 +1,400 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import os
+import json
+import math
+import time
+import struct
+import socket
+import argparse
+import selectors
+from sbf_decoder.blocks import BLOCK_NUMBERS, BLOCK_NAMES
+from sbf_decoder.sbf_decoder import sbfFrames, parseBlock, HEADER_LEN, SYNC
+
+name_num_dict = dict(zip(BLOCK_NAMES, BLOCK_NUMBERS))
+
+SUBSCRIBE_MODES = ('raw', 'decoded')
+
+# decoded records: u4 payload length + compact json [blockname, block_dict], see subscribeSbf
+RECORD_HEADER = struct.Struct('<I')
+
+
+class SbfBroker:
+    """
+    one receiver connection, republished to many local subscribers
+
+    The broker connects once to the receiver, frames and crc checks every block
+    once, decodes a block type only if a subscriber asked for decoded records and
+    serializes it once for all of them. Subscribers connect to a Unix domain socket
+    and send one json line:
+
+        {"mode": "raw" | "decoded", "blocks": ["INSNavGeod", ...] | null}
+
+    raw subscribers receive the validated sbf bytes, decoded subscribers length
+    prefixed json records (see subscribeSbf). A subscriber whose unsent data
+    exceeds max_buffer bytes is dropped, the others are never blocked. A block
+    that fails to decode is logged (once per block type) and counted in
+    decode_errors, raw subscribers still receive it.
+
+    Usage:
+        SbfBroker('192.168.1.10', 28784, '/tmp/sbf.sock').serveForever()
+    """
+
+    def __init__(self, ip: str, port: int, socket_path: str, bufsize=64 * 1024,
+                 max_buffer=4 * 1024 * 1024, reconnect_delay=1.0, log=print):
+        """
+        :param ip: receiver ip
+        :param port: receiver sbf streaming port
+        :param socket_path: Unix domain socket path for the subscribers
+        :param bufsize: receiver socket receive size
+        :param max_buffer: max unsent bytes per subscriber before it is dropped
+        :param reconnect_delay: seconds between receiver reconnection attempts
+        :param log: progress output function
+        """
+        self.address = (ip, port)
+        self.socket_path = socket_path
+        self.bufsize = bufsize
+        self.max_buffer = max_buffer
+        self.reconnect_delay = reconnect_delay
+        self.log = log
+
+        self.selector = selectors.DefaultSelector()
+        self.receiver = None
+        self.next_connect = 0.0
+        self.buf = bytearray()
+        self.subscribers = {}
+        self.running = False
+        # {blockno: number of blocks that failed to decode}
+        self.decode_errors = {}
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen()
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, 'accept')
+
+    def serveForever(self):
+        """ run the event loop until close() """
+        self.running = True
+        try:
+            while self.running:
+                if self.receiver is None and time.monotonic() >= self.next_connect:
+                    self._connectReceiver()
+
+                for key, events in self.selector.select(timeout=self.reconnect_delay):
+                    if key.data == 'accept':
+                        self._accept()
+                    elif key.data == 'receiver':
+                        self._readReceiver()
+                    elif key.fileobj in self.subscribers:
+                        # a subscriber may have been dropped earlier in this batch
+                        if events & selectors.EVENT_READ:
+                            self._readSubscriber(key.fileobj)
+                        if events & selectors.EVENT_WRITE and key.fileobj in self.subscribers:
+                            self._flush(key.fileobj)
+        finally:
+            self.running = False
+            self._cleanup()
+
+    def close(self):
+        """
+        stop serving, close all connections and remove the socket file;
+        a running serveForever (e.g. in another thread) stops within reconnect_delay
+        """
+        if self.running:
+            self.running = False
+        else:
+            self._cleanup()
+
+    def _cleanup(self):
+        if self.server.fileno() < 0:
+            return
+
+        for sock in list(self.subscribers):
+            self._drop(sock, 'broker closed')
+        if self.receiver is not None:
+            self._closeReceiver()
+
+        self.selector.unregister(self.server)
+        self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.selector.close()
+
+    def _connectReceiver(self):
+        """ (re)connect to the receiver, retried after reconnect_delay on failure """
+        try:
+            self.receiver = socket.create_connection(self.address, timeout=self.reconnect_delay)
+        except OSError as e:
+            self.log(f'receiver {self.address[0]}:{self.address[1]}: {e}')
+            self.next_connect = time.monotonic() + self.reconnect_delay
+            return
+
+        self.receiver.setblocking(False)
+        self.buf.clear()
+        self.selector.register(self.receiver, selectors.EVENT_READ, 'receiver')
+        self.log(f'receiver {self.address[0]}:{self.address[1]}: connected')
+
+    def _closeReceiver(self):
+        self.selector.unregister(self.receiver)
+        self.receiver.close()
+        self.receiver = None
+        self.next_connect = time.monotonic() + self.reconnect_delay
+
+    def _readReceiver(self):
+        """ frame the received bytes and publish every complete block once """
+        try:
+            msg = self.receiver.recv(self.bufsize)
+        except BlockingIOError:
+            return
+        except OSError:
+            msg = b''
+
+        if not msg:
+            self.log(f'receiver {self.address[0]}:{self.address[1]}: disconnected')
+            self._closeReceiver()
+            return
+
+        buf = self.buf
+        buf += msg
+        last = 0
+        for start, msg_len, blockno in sbfFrames(buf):
+            last = start + msg_len
+            self._publish(blockno, bytes(buf[start:last]))
+
+        # keep the (possibly incomplete) block after the last framed one
+        tail = buf.find(SYNC, last)
+        del buf[:tail if tail >= 0 else max(len(buf) - 1, last)]
+
+    def _publish(self, blockno, block):
+        """ send one block to the subscribers that want it, decoded at most once """
+        record = None
+        for sock, sub in list(self.subscribers.items()):
+            if sub['mode'] is None or (sub['blocknos'] is not None and blockno not in sub['blocknos']):
+                continue
+
+            if sub['mode'] == 'raw':
+                self._send(sock, block)
+                continue
+
+            if record is None:
+                record = self._decodedRecord(blockno, block)
+            if record:
+                self._send(sock, record)
+
+    def _decodedRecord(self, blockno, block):
+        """ length prefixed json record of a block, b'' if it can't be decoded """
+        try:
+            blockname, block_dict = parseBlock(blockno, block[HEADER_LEN:])
+        except Exception as e:
+            # e.g. an enum value missing in body_parser, the stream goes on
+            if blockno not in self.decode_errors:
+                self.log(f'block {blockno}: decoding failed, {type(e).__name__}: {e}')
+            self.decode_errors[blockno] = self.decode_errors.get(blockno, 0) + 1
+            return b''
+
+        if not block_dict:
+            return b''
+
+        # nan / inf, e.g. absent INSNav sub-blocks, are not valid json
+        payload = json.dumps([blockname, _jsonValue(block_dict)], separators=(',', ':'), allow_nan=False).encode()
+        return RECORD_HEADER.pack(len(payload)) + payload
+
+    def _accept(self):
+        sock, _ = self.server.accept()
+        sock.setblocking(False)
+        self.subscribers[sock] = {'handshake': bytearray(), 'mode': None, 'blocknos': None, 'out': bytearray()}
+        self.selector.register(sock, selectors.EVENT_READ, 'subscriber')
+
+    def _readSubscriber(self, sock):
+        """ read the subscription line; later data is ignored, b'' means closed """
+        try:
+            msg = sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            msg = b''
+
+        if not msg:
+            self._drop(sock, 'closed')
+            return
+
+        sub = self.subscribers[sock]
+        if sub['mode'] is not None:
+            return
+
+        sub['handshake'] += msg
+        if b'\n' not in sub['handshake']:
+            if len(sub['handshake']) > 4096:
+                self._drop(sock, 'invalid subscription')
+            return
+
+        try:
+            request = json.loads(sub['handshake'].split(b'\n', 1)[0])
+            mode = request.get('mode', 'decoded')
+            blocks = request.get('blocks')
+            if mode not in SUBSCRIBE_MODES:
+                raise ValueError(f'unknown mode {mode}')
+            sub['blocknos'] = None if blocks is None else {name_num_dict[name] for name in blocks}
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            self._drop(sock, f'invalid subscription: {e}')
+            return
+
+        sub['mode'] = mode
+        self.log(f'subscriber {sock.fileno()}: {mode} {blocks or "all blocks"}')
+
+    def _send(self, sock, data):
+        """ send without blocking, buffer the rest, drop the subscriber if it falls behind """
+        sub = self.subscribers[sock]
+        out = sub['out']
+        if not out:
+            try:
+                sent = sock.send(data)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self._drop(sock, 'closed')
+                return
+            if sent == len(data):
+                return
+            data = data[sent:]
+            self.selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, 'subscriber')
+
+        out += data
+        if len(out) > self.max_buffer:
+            self._drop(sock, f'too slow, more than {self.max_buffer} bytes pending')
+
+    def _flush(self, sock):
+        out = self.subscribers[sock]['out']
+        try:
+            sent = sock.send(out)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._drop(sock, 'closed')
+            return
+
+        del out[:sent]
+        if not out:
+            self.selector.modify(sock, selectors.EVENT_READ, 'subscriber')
+
+    def _drop(self, sock, reason):
+        self.log(f'subscriber {sock.fileno()}: dropped, {reason}')
+        del self.subscribers[sock]
+        self.selector.unregister(sock)
+        sock.close()
+
+
+def _jsonValue(value):
+    """ value with nan / inf floats replaced by None, tuples become lists """
+    if value.__class__ is float:
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _jsonValue(v) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return [_jsonValue(v) for v in value]
+    return value
+
+
+def _nanValue(value):
+    """ value with None replaced by nan, the decoder never produces None """
+    if value is None:
+        return math.nan
+    if value.__class__ is dict:
+        return {k: _nanValue(v) for k, v in value.items()}
+    if value.__class__ is list:
+        return [_nanValue(v) for v in value]
+    return value
+
+
+def _connectSubscriber(socket_path, mode, blocks):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    sock.sendall(json.dumps({'mode': mode, 'blocks': blocks}).encode() + b'\n')
+    return sock
+
+
+def subscribeSbf(socket_path: str, blocks=None, bufsize=64 * 1024):
+    """
+    decoded records of a broker
+
+    Wire format of a decoded record: u4 little endian payload length, then the
+    payload, utf-8 json without whitespace: [blockname, block_dict]. json has no
+    nan / inf, they are sent as null and yielded as nan again; tuples are yielded
+    as lists. A record is about 5 times the size of the raw block, use
+    subscribeSbfRaw + sbf_decoder.parseBlock if the bandwidth matters.
+
+    :param socket_path: broker Unix domain socket path
+    :param blocks: block names to receive, None for all
+    :param bufsize: socket receive size
+    :return: generator; sbf-blockname + sbf-block dictionary
+    """
+    with _connectSubscriber(socket_path, 'decoded', blocks) as sock:
+        buf = bytearray()
+        while True:
+            msg = sock.recv(bufsize)
+            if not msg:
+                return
+            buf += msg
+
+            pos = 0
+            while len(buf) - pos >= RECORD_HEADER.size:
+                size = RECORD_HEADER.unpack_from(buf, pos)[0]
+                end = pos + RECORD_HEADER.size + size
+                if end > len(buf):
+                    break
+                blockname, block_dict = json.loads(buf[pos + RECORD_HEADER.size:end])
+                pos = end
+                yield blockname, _nanValue(block_dict)
+            del buf[:pos]
+
+
+def subscribeSbfRaw(socket_path: str, blocks=None, bufsize=64 * 1024):
+    """
+    raw validated sbf blocks of a broker
+
+    :param socket_path: broker Unix domain socket path
+    :param blocks: block names to receive, None for all
+    :param bufsize: socket receive size
+    :return: generator; sbf block bytes (header + body)
+    """
+    with _connectSubscriber(socket_path, 'raw', blocks) as sock:
+        buf = bytearray()
+        while True:
+            msg = sock.recv(bufsize)
+            if not msg:
+                return
+            buf += msg
+
+            last = 0
+            for start, msg_len, _ in sbfFrames(buf):
+                last = start + msg_len
+                yield bytes(buf[start:last])
+            del buf[:last]
+
+
+def main(argv=None):
+    """ command line: run a broker for one receiver """
+    parser = argparse.ArgumentParser(description='republish one sbf receiver stream to local subscribers')
+    parser.add_argument('ip', help='receiver ip')
+    parser.add_argument('port', type=int, help='receiver sbf streaming port')
+    parser.add_argument('-s', '--socket', default='/tmp/sbf_broker.sock', help='Unix domain socket path')
+    parser.add_argument('--max-buffer', type=int, default=4 * 1024 * 1024,
+                        help='max unsent bytes per subscriber before it is dropped')
+    args = parser.parse_args(argv)
+
+    broker = SbfBroker(args.ip, args.port, args.socket, max_buffer=args.max_buffer)
+    try:
+        broker.serveForever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from sbf_decoder import __version__
+from sbf_decoder.columns import blocksToColumns
+from sbf_decoder.reader import readSbfLogFile
+
+META_FILE = 'meta.json'
+HASH_CHUNK = 1024 * 1024
+
+
+def fileDigest(filename):
+    """ blake2b content hash of a file """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dirSize(path):
+    """ total size of the files in a directory tree """
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+class DecodeCache:
+    """
+    on-disk cache of decoded .sbf log files
+
+    Every log file is stored as one entry directory holding one .npy file per
+    column of every block type (see columns.blocksToColumns); cached reads are
+    memory mapped. The entry key covers the file size, mtime, content hash and
+    the decoder version. Entries are evicted least recently used first once the
+    cache grows above max_bytes.
+
+    Usage:
+        cache = DecodeCache('~/.cache/sbf_decoder')
+        columns = cache.load('log.sbf')
+        columns['INSNavGeod']['Latitude']
+    """
+
+    def __init__(self, cache_dir, max_bytes=4 * 1024 ** 3):
+        """
+        :param cache_dir: cache directory, created if missing
+        :param max_bytes: cache size limit in bytes, None for no limit
+        """
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, filename):
+        """ cache key of a log file: size, mtime, content hash and decoder version """
+        stat = os.stat(filename)
+        ident = f'{stat.st_size}:{stat.st_mtime_ns}:{fileDigest(filename)}:{__version__}'
+        return hashlib.blake2b(ident.encode(), digest_size=16).hexdigest()
+
+    def load(self, filename, mmap_mode='r'):
+        """
+        decoded columns of a log file, decoded and stored on a cache miss
+
+        :param filename: .sbf log file
+        :param mmap_mode: numpy.load mmap_mode, None loads into memory
+        :return: {blockname: {column: np.ndarray}}
+        """
+        entry = os.path.join(self.cache_dir, self.key(filename))
+
+        if not os.path.isfile(os.path.join(entry, META_FILE)):
+            self._store(filename, entry)
+            self.evict(keep=entry)
+
+        return self._read(entry, mmap_mode)
+
+    def _store(self, filename, entry):
+        """ decode filename and write the entry atomically """
+        block_columns = blocksToColumns(readSbfLogFile(filename))
+
+        tmp = f'{entry}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        meta = {'source': os.path.abspath(filename), 'version': __version__, 'blocks': {}}
+        for blockname, columns in block_columns.items():
+            os.makedirs(os.path.join(tmp, blockname))
+            meta['blocks'][blockname] = list(columns)
+            for i, values in enumerate(columns.values()):
+                # column names may contain any character, files are numbered
+                np.save(os.path.join(tmp, blockname, f'{i}.npy'), values)
+
+        with open(os.path.join(tmp, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # stored concurrently by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _read(self, entry, mmap_mode):
+        """ load an entry and mark it as recently used """
+        meta_file = os.path.join(entry, META_FILE)
+        with open(meta_file) as f:
+            meta = json.load(f)
+        os.utime(meta_file)
+
+        return {
+            blockname: {
+                column: np.load(os.path.join(entry, blockname, f'{i}.npy'), mmap_mode=mmap_mode)
+                for i, column in enumerate(columns)
+            }
+            for blockname, columns in meta['blocks'].items()
+        }
+
+    def entries(self):
+        """
+        :return: list of (entry path, last used time, size in bytes, source file), oldest first
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            meta_file = os.path.join(self.cache_dir, name, META_FILE)
+            if '.tmp-' in name or not os.path.isfile(meta_file):
+                continue
+            with open(meta_file) as f:
+                source = json.load(f)['source']
+            path = os.path.join(self.cache_dir, name)
+            entries.append((path, os.path.getmtime(meta_file), _dirSize(path), source))
+
+        return sorted(entries, key=lambda e: e[1])
+
+    def size(self):
+        """ total cache size in bytes """
+        return sum(e[2] for e in self.entries())
+
+    def evict(self, keep=None):
+        """
+        remove least recently used entries until the cache fits max_bytes
+
+        :param keep: entry path never to remove
+        :return: number of removed entries
+        """
+        if self.max_bytes is None:
+            return 0
+
+        entries = self.entries()
+        total = sum(e[2] for e in entries)
+        removed = 0
+        for path, _, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+
+        return removed
+
+    def invalidate(self, filename):
+        """
+        remove all entries of a log file, whatever its current content
+
+        :return: number of removed entries
+        """
+        source = os.path.abspath(filename)
+        removed = 0
+        for path, _, _, entry_source in self.entries():
+            if entry_source == source:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+
+        return removed
+
+    def clear(self):
+        """ remove all entries """
+        for path, _, _, _ in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
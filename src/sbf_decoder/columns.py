@@ -0,0 +1,327 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+from functools import partial, lru_cache
+from sbf_decoder.body_parser import ins_sb_dict
+
+# numpy is imported on first use, flattenBlock is also used by the numpy-free decimate module
+
+# INSNav sub-blocks are 3 x f4, absent ones are decoded as a scalar nan
+INS_SB_NAMES = tuple(ins_sb_dict.values())
+INS_SB_WIDTH = 3
+
+# one GPS week in milliseconds
+WEEK_MS = 604800 * 1000
+
+SCALAR_TYPES = (int, float, str)
+SEQUENCE_TYPES = {tuple, list}
+
+# ExtSensorMeas sub-block Type -> column prefix of its SensorModel / ObsInfo
+EXT_SB_TYPES = {0: 'acc', 1: 'angular_rate', 3: 'info', 4: 'velocity', 20: 'zero_velocity'}
+
+
+def flattenBlock(blockname: str, block_dict: dict):
+    """
+    flatten one decoded block into a flat {column: scalar} dictionary
+
+    - tuples / lists are expanded into `<key>_0`, `<key>_1`, ...
+    - nested dictionaries are expanded into `<key>_<subkey>`
+    - ExtSensorMeas sub-blocks are expanded into their `data_dict` fields and
+      `<type>_SensorModel` / `<type>_ObsInfo`, see EXT_SB_TYPES; sub-blocks of a
+      non-zero Source get a `_src<Source>` suffix, e.g. `acc_x_src1`, so two
+      sensors of the same Type don't overwrite each other
+    - absent INSNav sub-blocks (nan) are expanded into 3 nan columns
+
+    :param blockname: sbf block name
+    :param block_dict: decoded block dictionary
+    :return: flat dictionary
+    """
+    flat = {}
+
+    for key, value in block_dict.items():
+        if key in INS_SB_NAMES and not isinstance(value, (tuple, list)):
+            value = (value,) * INS_SB_WIDTH
+
+        elif value.__class__ in SCALAR_TYPES:
+            flat[key] = value
+            continue
+
+        elif blockname == 'ExtSensorMeas' and key == 'sub-blocks':
+            for sb_dict in value:
+                for sb_key, sb_value in subBlockItems(sb_dict):
+                    flat[sb_key] = sb_value
+            continue
+
+        _flattenValue(flat, key, value)
+
+    return flat
+
+
+def subBlockItems(sb_dict: dict):
+    """
+    columns of one ExtSensorMeas sub-block, see flattenBlock;
+    a repeated Type + Source in one block keeps the last sub-block
+
+    :return: list of (column, value)
+    """
+    suffix = _sourceSuffix(sb_dict['Source'])
+    prefix = _typePrefix(sb_dict['Type'])
+    items = [
+        (f'{prefix}_SensorModel{suffix}', sb_dict['SensorModel']),
+        (f'{prefix}_ObsInfo{suffix}', sb_dict['ObsInfo']),
+    ]
+    for key, value in sb_dict['data_dict'].items():
+        if value.__class__ is tuple and len(value) == 1:
+            # ZeroVelocityFlag is unpacked as a 1-tuple
+            value = value[0]
+        items.append((key + suffix, value))
+    return items
+
+
+@lru_cache(maxsize=None)
+def _sourceSuffix(source: int):
+    return f'_src{source}' if source else ''
+
+
+@lru_cache(maxsize=None)
+def _typePrefix(sb_type: int):
+    return EXT_SB_TYPES.get(sb_type, f'type{sb_type}')
+
+
+def _flattenValue(flat: dict, key: str, value):
+    """ expand one (possibly nested) value into flat """
+    if value.__class__ in SCALAR_TYPES:
+        flat[key] = value
+    elif isinstance(value, dict):
+        for sub_key, sub_value in value.items():
+            _flattenValue(flat, f'{key}_{sub_key}' if key else sub_key, sub_value)
+    elif isinstance(value, (tuple, list)):
+        if len(value) == 1:
+            # e.g. ZeroVelocityFlag is unpacked as a 1-tuple
+            _flattenValue(flat, key, value[0])
+        else:
+            for i, sub_value in enumerate(value):
+                _flattenValue(flat, f'{key}_{i}', sub_value)
+    else:
+        flat[key] = value
+
+
+def rowsToColumns(rows: list):
+    """
+    convert a list of flat dictionaries into a {column: np.ndarray} dictionary
+
+    numeric columns become int64 / float64 arrays, text columns unicode arrays.
+    Fields missing in some rows are filled with nan (numeric) or '' (text).
+
+    :param rows: list of flat dictionaries, see flattenBlock
+    :return: dictionary of equal length arrays
+    """
+    keys = {}
+    for row in rows:
+        for key in row:
+            keys.setdefault(key, None)
+
+    return {key: _columnArray([row.get(key) for row in rows]) for key in keys}
+
+
+def _columnArray(values: list):
+    """
+    one column as an array, None values are filled with nan / ''
+
+    A column holding text and numbers (e.g. RTCMDatum Datum: a datum code or a
+    text message) becomes a text column, as in export._schema.
+    """
+    import numpy as np
+
+    classes = set(map(type, values))
+    missing = type(None) in classes
+
+    if str in classes:
+        if classes != {str}:
+            values = ['' if v is None else str(v) for v in values]
+        return np.array(values, dtype=str)
+
+    if missing:
+        values = [np.nan if v is None else v for v in values]
+    column = np.array(values)
+    if column.dtype.kind not in 'iu':
+        column = column.astype(np.float64)
+    return column
+
+
+class BlockColumnizer:
+    """
+    collect decoded blocks of one type straight into per column lists
+
+    The column layout (one adder per top level key) is built from the first
+    block and reused as long as the blocks have the same keys, so a block is
+    appended without building a flat dictionary. The columns are the same as
+    flattenBlock + rowsToColumns.
+
+    Usage:
+        columnizer = BlockColumnizer('INSNavGeod')
+        for block_dict in ...:
+            columnizer.append(block_dict)
+        columns = columnizer.columns()
+    """
+
+    def __init__(self, blockname: str):
+        """
+        :param blockname: sbf block name
+        """
+        self.blockname = blockname
+        self.clear()
+
+    def __len__(self):
+        return self.n_rows
+
+    def append(self, block_dict: dict):
+        """ add one decoded block """
+        keys = tuple(block_dict)
+        if keys != self._keys:
+            self._layout(keys, block_dict)
+
+        for add, value in zip(self._adders, block_dict.values()):
+            add(value)
+        self.n_rows += 1
+
+    def clear(self):
+        """ remove all blocks """
+        self.values = {}
+        self.n_rows = 0
+        self._keys = None
+        self._adders = None
+
+    def columns(self):
+        """
+        :return: {column: np.ndarray}, see rowsToColumns
+        """
+        self._pad()
+        return {key: _columnArray(values) for key, values in self.values.items()}
+
+    def _pad(self):
+        """ fill the columns missing in the last rows with None """
+        for values in self.values.values():
+            if len(values) < self.n_rows:
+                values.extend([None] * (self.n_rows - len(values)))
+
+    def _column(self, key: str):
+        values = self.values.get(key)
+        if values is None:
+            values = self.values[key] = [None] * self.n_rows
+        return values
+
+    def _layout(self, keys: tuple, block_dict: dict):
+        """ one adder per key, from the value types of the first block with these keys """
+        self._pad()
+        self._keys = keys
+        self._adders = []
+
+        for key, value in block_dict.items():
+            if key in INS_SB_NAMES:
+                add = _sequenceAdder([self._column(f'{key}_{i}') for i in range(INS_SB_WIDTH)], repeat=True)
+            elif value.__class__ in SCALAR_TYPES:
+                add = self._column(key).append
+            elif self.blockname == 'ExtSensorMeas' and key == 'sub-blocks':
+                add = self._addSubBlocks
+            elif value.__class__ in SEQUENCE_TYPES and len(value) > 0 and \
+                    all(v.__class__ in SCALAR_TYPES for v in value):
+                names = [key] if len(value) == 1 else [f'{key}_{i}' for i in range(len(value))]
+                add = _sequenceAdder([self._column(name) for name in names], repeat=False,
+                                     fallback=partial(self._addNested, key))
+            else:
+                add = partial(self._addNested, key)
+            self._adders.append(add)
+
+    def _setCell(self, key: str, value):
+        """ set a column of the current row, for columns not present in every row """
+        values = self.values.get(key)
+        if values is None:
+            values = self.values[key] = []
+        missing = self.n_rows - len(values)
+        if missing < 0:
+            values[self.n_rows] = value
+            return
+        if missing:
+            values.extend([None] * missing)
+        values.append(value)
+
+    def _addNested(self, key: str, value):
+        """ a value without a fixed shape, expanded as in flattenBlock """
+        flat = {}
+        _flattenValue(flat, key, value)
+        for flat_key, flat_value in flat.items():
+            self._setCell(flat_key, flat_value)
+
+    def _addSubBlocks(self, sub_blocks):
+        """ ExtSensorMeas sub-blocks, see flattenBlock """
+        for sb_dict in sub_blocks:
+            for key, value in subBlockItems(sb_dict):
+                self._setCell(key, value)
+
+
+def _sequenceAdder(columns: list, repeat: bool, fallback=None):
+    """
+    adder of a fixed width sequence field, one value per column
+
+    :param columns: column lists
+    :param repeat: a scalar value is added to every column (absent INSNav sub-block)
+    :param fallback: adder of values with another shape
+    """
+    appends = [values.append for values in columns]
+    width = len(appends)
+
+    def add(value):
+        if value.__class__ in SEQUENCE_TYPES and len(value) == width:
+            for append, v in zip(appends, value):
+                append(v)
+        elif repeat:
+            for append in appends:
+                append(value)
+        else:
+            # keep every column one value per row
+            for append in appends:
+                append(None)
+            fallback(value)
+
+    return add
+
+
+def blocksToColumns(blocks, blocknames=None):
+    """
+    collect decoder output into per block type columns
+
+    :param blocks: iterable of (blockname, block_dict), e.g. sbfDecoder output
+    :param blocknames: only keep these block names, None keeps all
+    :return: {blockname: {column: np.ndarray}}
+    """
+    columnizers = {}
+    for blockname, block_dict in blocks:
+        columnizer = columnizers.get(blockname)
+        if columnizer is None:
+            if blocknames is not None and blockname not in blocknames:
+                continue
+            columnizer = columnizers[blockname] = BlockColumnizer(blockname)
+        columnizer.append(block_dict)
+
+    return {blockname: columnizer.columns() for blockname, columnizer in columnizers.items()}
+
+
+def blockTimes(columns: dict, time_key='ts'):
+    """
+    time axis of a columns dictionary
+
+    :param columns: {column: np.ndarray} of one block type
+    :param time_key: 'ts' for unix epoch in milliseconds,
+                     'gps' for WNc * week + TOW in milliseconds
+    :return: float64 array in milliseconds
+    """
+    import numpy as np
+
+    if time_key == 'gps':
+        return columns['WNc'].astype(np.float64) * WEEK_MS + columns['TOW']
+
+    return np.asarray(columns[time_key], dtype=np.float64)
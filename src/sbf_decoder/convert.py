@@ -0,0 +1,257 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sbf_decoder.blocks import BLOCK_NAMES
+from sbf_decoder.export import exportSbfLogFile, tempPath, EXPORT_FORMATS, CHUNK_SIZE
+
+MANIFEST_SUFFIX = '.done.json'
+
+
+def _globRoot(pattern):
+    """ leading directories of a glob pattern without wildcards, e.g. logs for logs/**/*.sbf """
+    root = pattern
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or os.curdir
+
+
+def logFileRoots(paths):
+    """
+    expand directories and glob patterns into .sbf files, each with the root
+    directory its output name is relative to: the directory argument, the
+    leading directories of the glob pattern or the directory of a file argument;
+    a file found by several arguments keeps the root of the first one
+
+    :param paths: list of files, directories or glob patterns
+    :return: {filename: root}, sorted by filename
+    """
+    roots = {}
+    for path in paths:
+        if os.path.isdir(path):
+            root = path
+            matches = [p for p in glob.glob(os.path.join(path, '*.sbf')) if os.path.isfile(p)]
+        elif os.path.isfile(path):
+            root = os.path.dirname(path) or os.curdir
+            matches = [path]
+        else:
+            root = _globRoot(path)
+            matches = [p for p in glob.glob(path, recursive=True) if os.path.isfile(p)]
+        for filename in matches:
+            roots.setdefault(filename, root)
+
+    return dict(sorted(roots.items()))
+
+
+def findLogFiles(paths):
+    """
+    expand directories and glob patterns into a sorted list of .sbf files
+
+    :param paths: list of files, directories or glob patterns
+    :return: list of file paths
+    """
+    return list(logFileRoots(paths))
+
+
+def outputStems(files, roots=None):
+    """
+    output name of every log file: its path relative to its root directory
+    without the extension, e.g. logs/d1/x.sbf and logs/d2/x.sbf found by
+    logs/**/*.sbf become d1/x and d2/x, so the outputs mirror the input
+    directories; the stem of a file does not depend on the other files of a run
+
+    :param files: list of .sbf log files
+    :param roots: root directory of all files or {filename: root}, see logFileRoots;
+                  None for the directory of every file, i.e. the stem is the file name
+    :return: {filename: stem}
+    :raise ValueError: if a file is not below its root or two files get the same stem, e.g. x.sbf and x.SBF
+    """
+    stems = {}
+    seen = {}
+    for filename in files:
+        if roots is None:
+            root = os.path.dirname(filename) or os.curdir
+        else:
+            root = roots if isinstance(roots, str) else roots[filename]
+        stem = os.path.splitext(os.path.relpath(os.path.abspath(filename), os.path.abspath(root)))[0]
+        if stem == os.pardir or stem.startswith(os.pardir + os.sep):
+            raise ValueError(f"'{filename}' is not below the root directory '{root}'")
+        key = os.path.normcase(stem)
+        if key in seen:
+            raise ValueError(f"'{seen[key]}' and '{filename}' would be written to the same output '{stem}', "
+                             f"use a common root directory")
+        seen[key] = filename
+        stems[filename] = stem
+
+    return stems
+
+
+def manifestPath(filename, out_dir, stem=None):
+    """
+    path of the manifest written once all outputs of a log file are complete
+
+    :param stem: output name, see outputStems; None for the log file name
+    """
+    if stem is None:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(out_dir, stem + MANIFEST_SUFFIX)
+
+
+def _blockSelection(blocknames):
+    """ block selection as stored in the manifest: sorted names, None for all blocks """
+    return None if blocknames is None else sorted(set(blocknames))
+
+
+def isUpToDate(filename, out_dir, fmt, stem=None, blocknames=None):
+    """
+    True if this log file was converted to fmt with the same block selection
+    after its last change
+
+    :param stem: output name, see outputStems; None for the log file name
+    :param blocknames: exported block names, None for all blocks
+    """
+    try:
+        with open(manifestPath(filename, out_dir, stem)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    stat = os.stat(filename)
+    return (manifest.get('source') == os.path.abspath(filename)
+            and manifest.get('size') == stat.st_size
+            and manifest.get('mtime_ns') == stat.st_mtime_ns
+            and manifest.get('format') == fmt
+            and manifest.get('blocks', None) == _blockSelection(blocknames)
+            and all(os.path.isfile(p) for p in manifest.get('outputs', {}).values()))
+
+
+def convertFile(filename, out_dir, fmt='npz', chunk_size=CHUNK_SIZE, blocknames=None, stem=None):
+    """
+    export one log file and write its manifest, runs in a worker process
+
+    :param stem: output name, see outputStems; None for the log file name
+    :return: filename, file size in bytes, elapsed seconds, outputs or None, error message or None
+    """
+    start = time.perf_counter()
+    try:
+        stat = os.stat(filename)
+        # exportSbfLogFile names the outputs after the log file name
+        file_dir = os.path.join(out_dir, os.path.dirname(stem)) if stem else out_dir
+        outputs = exportSbfLogFile(filename, file_dir, fmt=fmt, chunk_size=chunk_size, blocknames=blocknames)
+
+        manifest = {'source': os.path.abspath(filename), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                    'format': fmt, 'blocks': _blockSelection(blocknames), 'outputs': outputs}
+        path = manifestPath(filename, out_dir, stem)
+        tmp = tempPath(path)
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        return filename, stat.st_size, time.perf_counter() - start, outputs, None
+
+    except Exception as e:
+        return filename, 0, time.perf_counter() - start, None, f'{type(e).__name__}: {e}'
+
+
+def convertFiles(files, out_dir, fmt='npz', workers=None, chunk_size=CHUNK_SIZE, blocknames=None,
+                 force=False, roots=None, log=print):
+    """
+    export many log files in parallel in a process pool;
+    a failing file is reported and does not stop the others
+
+    :param files: list of .sbf log files
+    :param out_dir: output directory
+    :param fmt: export format, see export.exportBlocks
+    :param workers: number of worker processes, None for os.cpu_count()
+    :param chunk_size: rows per chunk
+    :param blocknames: only export these block names, None exports all
+    :param force: convert files whose outputs are up to date, too, i.e. converted
+                  to fmt with the same blocknames after their last change
+    :param roots: root directory of the output names, see outputStems
+    :param log: progress output function
+    :return: {'converted': [...], 'skipped': [...], 'failed': {filename: error}}
+    :raise ValueError: if two files would be written to the same outputs, see outputStems
+    """
+    stems = outputStems(files, roots)
+    os.makedirs(out_dir, exist_ok=True)
+    result = {'converted': [], 'skipped': [], 'failed': {}}
+
+    todo = []
+    for filename in files:
+        if not force and isUpToDate(filename, out_dir, fmt, stems[filename], blocknames):
+            result['skipped'].append(filename)
+            log(f'[skip] {filename}: up to date')
+        else:
+            todo.append(filename)
+
+    start = time.perf_counter()
+    total_bytes = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convertFile, f, out_dir, fmt, chunk_size, blocknames, stems[f]) for f in todo]
+
+        for i, future in enumerate(as_completed(futures), 1):
+            filename, size, elapsed, outputs, error = future.result()
+            if error:
+                result['failed'][filename] = error
+                log(f'[{i}/{len(todo)}] {filename}: FAILED {error}')
+                continue
+
+            total_bytes += size
+            result['converted'].append(filename)
+            log(f'[{i}/{len(todo)}] {filename}: {len(outputs)} block types, '
+                f'{size / 1e6:.1f} MB in {elapsed:.2f} s ({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)')
+
+    elapsed = time.perf_counter() - start
+    log(f'converted {len(result["converted"])}, skipped {len(result["skipped"])}, '
+        f'failed {len(result["failed"])}; {total_bytes / 1e6:.1f} MB in {elapsed:.2f} s '
+        f'({total_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)')
+
+    return result
+
+
+def main(argv=None):
+    """ command line: convert directories / globs of sbf log files in parallel """
+    parser = argparse.ArgumentParser(description='convert directories of .sbf log files in parallel')
+    parser.add_argument('paths', nargs='+', help='.sbf files, directories or glob patterns')
+    parser.add_argument('-o', '--out-dir', default='.', help='output directory')
+    parser.add_argument('-f', '--format', default='npz', choices=EXPORT_FORMATS)
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, default: cpu count')
+    parser.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('-b', '--blocks', nargs='+', choices=BLOCK_NAMES, help='block names to export')
+    parser.add_argument('--force', action='store_true', help='convert up to date files, too')
+    parser.add_argument('--root', help='output names are the log file paths relative to this directory, '
+                                       'default: relative to the directory / glob argument of each file')
+    args = parser.parse_args(argv)
+
+    roots = logFileRoots(args.paths)
+    files = list(roots)
+    if not files:
+        print('no .sbf files found', file=sys.stderr)
+        return 1
+
+    try:
+        result = convertFiles(files, args.out_dir, fmt=args.format, workers=args.workers,
+                              chunk_size=args.chunk_size, blocknames=args.blocks, force=args.force,
+                              roots=args.root or roots)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
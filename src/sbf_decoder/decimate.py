@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+from sbf_decoder.blocks import BLOCK_NUMBERS, BLOCK_NAMES
+from sbf_decoder.columns import flattenBlock, WEEK_MS
+from sbf_decoder.sbf_decoder import gpsTime2Utc
+
+name_num_dict = dict(zip(BLOCK_NAMES, BLOCK_NUMBERS))
+
+AGGREGATIONS = ('mean', 'min', 'max', 'last')
+
+# TOW / WNc do-not-use values
+TOW_DNU = 4294967295
+WNC_DNU = 65535
+
+
+class BlockDecimator:
+    """
+    decide per block type which blocks are parsed, from the block number and the
+    TOW / WNc at the start of the body, i.e. before the body is parsed
+
+    Usage:
+        keep = BlockDecimator({'INSNavGeod': {'interval': 0.1}, 'ExtSensorMeas': {'every': 20}})
+        for blockname, block_dict in readSbfLogFile('log.sbf', keep=keep):
+            ...
+
+    options per block name:
+        every: keep every Nth block
+        interval: keep at most one block per interval in seconds, the first
+                  block of every GPS time aligned interval
+    block types without options are always kept
+    """
+
+    def __init__(self, options: dict):
+        """
+        :param options: {blockname: {'every': N} or {'interval': seconds}}
+        :raise ValueError: for unknown block names, every < 1 or an interval below 1 ms
+        """
+        self.every = {}
+        self.interval = {}
+        for blockname, block_options in options.items():
+            if blockname not in name_num_dict:
+                raise ValueError(f"unknown block name '{blockname}'")
+            blockno = name_num_dict[blockname]
+            if block_options.get('every') is not None:
+                every = int(block_options['every'])
+                if every < 1:
+                    raise ValueError(f"every of '{blockname}' must be at least 1, got {block_options['every']}")
+                self.every[blockno] = every
+            if block_options.get('interval') is not None:
+                interval_ms = round(block_options['interval'] * 1000)
+                if interval_ms < 1:
+                    raise ValueError(f"interval of '{blockname}' must be at least 1 ms, got {block_options['interval']} s")
+                self.interval[blockno] = interval_ms
+
+        self.counts = dict.fromkeys(self.every, 0)
+        self.last_bucket = dict.fromkeys(self.interval)
+
+    def __call__(self, blockno: int, tow: int, wnc: int):
+        """
+        :return: True if the block is to be parsed
+        """
+        if blockno in self.every:
+            count = self.counts[blockno]
+            self.counts[blockno] = count + 1
+            if count % self.every[blockno]:
+                return False
+
+        if blockno in self.interval:
+            if tow == TOW_DNU or wnc == WNC_DNU:
+                return False
+            bucket = (wnc * WEEK_MS + tow) // self.interval[blockno]
+            if bucket == self.last_bucket[blockno]:
+                return False
+            self.last_bucket[blockno] = bucket
+
+        return True
+
+
+def aggregateBlocks(blocks, windows: dict):
+    """
+    aggregate the numeric fields of blocks over tumbling GPS time windows
+
+    Aggregated block types are yielded once per window, when the first block of
+    the next window arrives or the input ends, as a flat dictionary (see
+    columns.flattenBlock) holding the aggregated fields, 'count' and TOW / WNc /
+    utc / ts of the window start. Text fields keep their last value. Other block
+    types are passed through unchanged.
+
+    :param blocks: iterable of (blockname, block_dict), e.g. readSbfLogFile output
+    :param windows: {blockname: (window in seconds, 'mean' | 'min' | 'max' | 'last')},
+                    several aggregations as a tuple produce '<field>_<aggregation>' fields
+    :return: generator; sbf-blockname + sbf-block dictionary
+    :raise ValueError: for unknown aggregations or a window below 1 ms
+    """
+    specs = {}
+    for blockname, (window, how) in windows.items():
+        hows = (how,) if isinstance(how, str) else tuple(how)
+        for h in hows:
+            if h not in AGGREGATIONS:
+                raise ValueError(f"unknown aggregation '{h}', choose from {AGGREGATIONS}")
+        if round(window * 1000) < 1:
+            raise ValueError(f"window of '{blockname}' must be at least 1 ms, got {window} s")
+        specs[blockname] = round(window * 1000), hows
+
+    states = {}
+    for blockname, block_dict in blocks:
+        if blockname not in specs:
+            yield blockname, block_dict
+            continue
+
+        window_ms, hows = specs[blockname]
+        window = (block_dict['WNc'] * WEEK_MS + block_dict['TOW']) // window_ms
+
+        state = states.get(blockname)
+        if state is not None and state['window'] != window:
+            yield blockname, _windowResult(state, window_ms, hows)
+            state = None
+        if state is None:
+            state = states[blockname] = {'window': window, 'count': 0, 'sum': {}, 'n': {}, 'min': {}, 'max': {}, 'last': {}}
+
+        _accumulate(state, flattenBlock(blockname, block_dict))
+
+    for blockname, state in states.items():
+        yield blockname, _windowResult(state, specs[blockname][0], specs[blockname][1])
+
+
+def _accumulate(state, flat):
+    """ add one flattened block to the window state """
+    state['count'] += 1
+    sums, counts, mins, maxs, last = state['sum'], state['n'], state['min'], state['max'], state['last']
+
+    for key, value in flat.items():
+        if key in ('TOW', 'WNc', 'utc', 'ts'):
+            continue
+        last[key] = value
+        if isinstance(value, str) or value != value:
+            # text or nan
+            continue
+        if key in sums:
+            sums[key] += value
+            counts[key] += 1
+            if value < mins[key]:
+                mins[key] = value
+            if value > maxs[key]:
+                maxs[key] = value
+        else:
+            sums[key] = value
+            counts[key] = 1
+            mins[key] = maxs[key] = value
+
+
+def _windowResult(state, window_ms, hows):
+    """ aggregated flat dictionary of one window """
+    start_ms = state['window'] * window_ms
+    wnc, tow = divmod(start_ms, WEEK_MS)
+
+    result = {'TOW': tow, 'WNc': wnc, 'count': state['count']}
+    for key, value in state['last'].items():
+        if key not in state['sum']:
+            # text or nan only
+            result[key] = value
+            continue
+        for how in hows:
+            name = key if len(hows) == 1 else f'{key}_{how}'
+            if how == 'mean':
+                result[name] = state['sum'][key] / state['n'][key]
+            elif how == 'min':
+                result[name] = state['min'][key]
+            elif how == 'max':
+                result[name] = state['max'][key]
+            else:
+                result[name] = value
+
+    result['utc'], result['ts'] = gpsTime2Utc(tow=tow, wnc=wnc)
+    return result
@@ -0,0 +1,277 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import os
+import csv
+import shutil
+import zipfile
+import argparse
+import tempfile
+import numpy as np
+from sbf_decoder.blocks import BLOCK_NAMES
+from sbf_decoder.columns import BlockColumnizer
+from sbf_decoder.reader import readSbfLogFile
+
+EXPORT_FORMATS = ('npz', 'csv', 'h5')
+FILE_EXTENSIONS = {'npz': '.npz', 'csv': '.csv', 'h5': '.h5'}
+
+# rows per block type held in memory before they are written
+CHUNK_SIZE = 50000
+
+# width of text columns whose chunks can't be promoted to a common dtype
+STR_DTYPE = np.dtype('<U64')
+
+
+def exportBlocks(blocks, out_dir, fmt='npz', chunk_size=CHUNK_SIZE, blocknames=None, prefix=''):
+    """
+    write decoded blocks into one columnar file per block type
+
+    Blocks are columnized (see columns.BlockColumnizer) in chunks of
+    chunk_size rows per block type. Every full chunk is spilled to a temporary
+    .npz, the output files are assembled chunk by chunk at the end, so the
+    memory use is bounded by the chunk size and not by the log size.
+
+    :param blocks: iterable of (blockname, block_dict), e.g. readSbfLogFile output
+    :param out_dir: output directory, created if missing
+    :param fmt: 'npz', 'csv' or 'h5' (requires h5py)
+    :param chunk_size: rows per chunk
+    :param blocknames: only export these block names, None exports all
+    :param prefix: output file name prefix, e.g. the log file name
+    :return: {blockname: output file path}
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format '{fmt}', choose from {EXPORT_FORMATS}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    spill_dir = tempfile.mkdtemp(prefix='.sbf-export-', dir=out_dir)
+
+    try:
+        columnizers = {}
+        chunks = {}
+        for blockname, block_dict in blocks:
+            columnizer = columnizers.get(blockname)
+            if columnizer is None:
+                if blocknames is not None and blockname not in blocknames:
+                    continue
+                columnizer = columnizers[blockname] = BlockColumnizer(blockname)
+
+            columnizer.append(block_dict)
+            if len(columnizer) >= chunk_size:
+                _spillChunk(spill_dir, columnizer, chunks)
+                columnizer.clear()
+
+        for columnizer in columnizers.values():
+            if len(columnizer):
+                _spillChunk(spill_dir, columnizer, chunks)
+
+        outputs = {}
+        for blockname, block_chunks in chunks.items():
+            path = os.path.join(out_dir, prefix + blockname + FILE_EXTENSIONS[fmt])
+            _writeOutput(path, fmt, block_chunks)
+            outputs[blockname] = path
+
+        return outputs
+
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def exportSbfLogFile(filename, out_dir, fmt='npz', chunk_size=CHUNK_SIZE, blocknames=None):
+    """
+    decode a sbf log file and export it, see exportBlocks;
+    output files are named <log file name>_<blockname>.<fmt>
+
+    :return: {blockname: output file path}
+    """
+    prefix = os.path.splitext(os.path.basename(filename))[0] + '_'
+    return exportBlocks(readSbfLogFile(filename), out_dir, fmt=fmt, chunk_size=chunk_size,
+                        blocknames=blocknames, prefix=prefix)
+
+
+def _spillChunk(spill_dir, columnizer, chunks):
+    """
+    write the collected blocks of one type to a temporary .npz;
+    chunks[blockname] gets (path, {column: dtype}, number of rows)
+    """
+    block_chunks = chunks.setdefault(columnizer.blockname, [])
+    path = os.path.join(spill_dir, f'{columnizer.blockname}_{len(block_chunks):06d}.npz')
+
+    columns = columnizer.columns()
+    # keep the column order, np.savez keys must be valid file names
+    np.savez(path, **{f'{i}': values for i, values in enumerate(columns.values())},
+             __columns__=np.array(list(columns), dtype=str))
+    block_chunks.append((path, {name: values.dtype for name, values in columns.items()}, len(columnizer)))
+
+
+def _iterChunks(block_chunks):
+    """ yield {column: np.ndarray} of every spilled chunk """
+    for path, _, _ in block_chunks:
+        with np.load(path) as npz:
+            names = npz['__columns__'].tolist()
+            yield {name: npz[f'{i}'] for i, name in enumerate(names)}
+
+
+def _schema(block_chunks):
+    """
+    column order, dtypes and row count over all chunks, from the spilled dtypes
+
+    :return: {column: dtype}, number of rows
+    """
+    dtypes = {}
+    missing = set()
+    n_rows = 0
+    for i, (_, chunk_dtypes, n) in enumerate(block_chunks):
+        for name in dtypes:
+            if name not in chunk_dtypes:
+                missing.add(name)
+        for name, dtype in chunk_dtypes.items():
+            if name not in dtypes:
+                if i:
+                    missing.add(name)
+                dtypes[name] = dtype
+                continue
+            try:
+                dtypes[name] = np.result_type(dtypes[name], dtype)
+            except TypeError:
+                dtypes[name] = STR_DTYPE
+        n_rows += n
+
+    # columns absent in some chunks are filled with nan
+    for name in missing:
+        if dtypes[name].kind in 'iub':
+            dtypes[name] = np.dtype(np.float64)
+
+    return dtypes, n_rows
+
+
+def _chunkColumn(columns, name, dtype, n):
+    """ column of one chunk in the final dtype, filled if absent """
+    if name in columns:
+        return columns[name].astype(dtype, copy=False)
+    return np.full(n, '' if dtype.kind in 'US' else np.nan, dtype=dtype)
+
+
+def tempPath(path):
+    """
+    create a unique temporary file next to path, to be renamed to path once written;
+    concurrent writers of the same path don't share it
+
+    :return: temporary file path, with the permissions of a newly created file
+    """
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                               dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    # mkstemp creates the file as 0600
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp, 0o666 & ~umask)
+    return tmp
+
+
+def _writeOutput(path, fmt, block_chunks):
+    """ assemble the spilled chunks into the output file, atomically replaced """
+    dtypes, n_rows = _schema(block_chunks)
+    tmp = tempPath(path)
+
+    try:
+        if fmt == 'npz':
+            _writeNpz(tmp, block_chunks, dtypes, n_rows)
+        elif fmt == 'csv':
+            _writeCsv(tmp, block_chunks, dtypes)
+        else:
+            _writeH5(tmp, block_chunks, dtypes, n_rows)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _writeNpz(path, block_chunks, dtypes, n_rows):
+    """
+    one .npy member per column, uncompressed; every chunk is loaded once and
+    split into one .npy file per column, which are then copied into the zip
+    """
+    column_dir = tempfile.mkdtemp(prefix='.columns-', dir=os.path.dirname(block_chunks[0][0]))
+
+    try:
+        column_files = {}
+        for i, (name, dtype) in enumerate(dtypes.items()):
+            column_files[name] = os.path.join(column_dir, f'{i}.npy')
+            with open(column_files[name], 'wb') as f:
+                header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (n_rows,)}
+                np.lib.format.write_array_header_2_0(f, header)
+
+        for columns in _iterChunks(block_chunks):
+            n = len(next(iter(columns.values())))
+            for name, dtype in dtypes.items():
+                with open(column_files[name], 'ab') as f:
+                    _chunkColumn(columns, name, dtype, n).tofile(f)
+
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, column_file in column_files.items():
+                zf.write(column_file, f'{name}.npy')
+                os.remove(column_file)
+
+    finally:
+        shutil.rmtree(column_dir, ignore_errors=True)
+
+
+def _writeCsv(path, block_chunks, dtypes):
+    """ one row per block, header line with the column names """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(dtypes))
+        for columns in _iterChunks(block_chunks):
+            n = len(next(iter(columns.values())))
+            values = [_chunkColumn(columns, name, dtype, n).tolist() for name, dtype in dtypes.items()]
+            writer.writerows(zip(*values))
+
+
+def _writeH5(path, block_chunks, dtypes, n_rows):
+    """ one dataset per column, written slice by slice """
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("h5 export requires h5py: pip install h5py")
+
+    with h5py.File(path, 'w') as h5:
+        datasets = {}
+        for name, dtype in dtypes.items():
+            # h5py stores fixed width text as bytes
+            h5_dtype = np.dtype(f'S{dtype.itemsize // 4}') if dtype.kind == 'U' else dtype
+            datasets[name] = h5.create_dataset(name, shape=(n_rows,), dtype=h5_dtype,
+                                               chunks=(min(n_rows, CHUNK_SIZE),) if n_rows else None)
+
+        start = 0
+        for columns in _iterChunks(block_chunks):
+            n = len(next(iter(columns.values())))
+            for name, dtype in dtypes.items():
+                values = _chunkColumn(columns, name, dtype, n)
+                if dtype.kind == 'U':
+                    values = np.char.encode(values, 'utf-8')
+                datasets[name][start:start + n] = values
+            start += n
+
+
+def main(argv=None):
+    """ command line: export sbf log files to one columnar file per block type """
+    parser = argparse.ArgumentParser(description='export .sbf log files to npz / csv / h5, one file per block type')
+    parser.add_argument('files', nargs='+', help='.sbf log files')
+    parser.add_argument('-o', '--out-dir', default='.', help='output directory')
+    parser.add_argument('-f', '--format', default='npz', choices=EXPORT_FORMATS)
+    parser.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('-b', '--blocks', nargs='+', choices=BLOCK_NAMES, help='block names to export')
+    args = parser.parse_args(argv)
+
+    for filename in args.files:
+        outputs = exportSbfLogFile(filename, args.out_dir, fmt=args.format,
+                                   chunk_size=args.chunk_size, blocknames=args.blocks)
+        for blockname, path in outputs.items():
+            print(f'{filename}: {blockname} -> {path}')
+
+
+if __name__ == '__main__':
+    main()
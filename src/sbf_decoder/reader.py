@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import mmap
+import socket
+import struct
+from sbf_decoder.sbf_decoder import sbfFrames, sbfBlocks, parseBlock, HEADER_LEN, SYNC
+
+
+#################################################
+### decode sbf data streaming
+#################################################
+def readSbfDataStream(ip: str, port: int, bufsize=1024 * 2, keep=None):
+    """
+    decode the sensor data stream,
+    blocks split over several tcp/ip packages are reassembled
+
+    :param ip: device ip
+    :param port: sbf streaming port
+    :param bufsize: socket receive size
+    :param keep: optional keep(blockno, TOW, WNc) -> bool, see sbfBlocks
+    :return: generator; sbf-blockname + sbf-block dictionary
+    """
+    with socket.create_connection((ip, port)) as s:
+        yield from readSbfSocket(s, bufsize, keep)
+
+
+def readSbfSocket(s: socket.socket, bufsize=1024 * 2, keep=None):
+    """
+    decode the sbf data received on a connected socket until it is closed
+
+    :param s: connected socket
+    :param bufsize: socket receive size
+    :param keep: optional keep(blockno, TOW, WNc) -> bool, see sbfBlocks
+    :return: generator; sbf-blockname + sbf-block dictionary
+    """
+    buf = bytearray()
+
+    while True:
+        msg = s.recv(bufsize)
+        if not msg:
+            # connection closed
+            return
+        buf += msg
+
+        last = 0
+        for start, msg_len, blockno in sbfFrames(buf):
+            last = start + msg_len
+            if keep is not None and not keep(blockno, *struct.unpack_from('<IH', buf, start + HEADER_LEN)):
+                continue
+
+            blockname, block_dict = parseBlock(blockno, bytes(buf[start + HEADER_LEN:last]))
+            if block_dict:
+                yield blockname, block_dict
+
+        # keep the (possibly incomplete) block after the last decoded one
+        tail = buf.find(SYNC, last)
+        del buf[:tail if tail >= 0 else max(len(buf) - 1, last)]
+
+
+#################################################
+### decode .sbf log file
+#################################################
+def readSbfLogFile(filename, keep=None):
+    """
+    decode a sbf log file, the file is memory mapped instead of read at once
+
+    :param filename: .sbf log file
+    :param keep: optional keep(blockno, TOW, WNc) -> bool, see sbfBlocks
+    :return: generator; sbf-blockname + sbf-block dictionary
+    """
+    with open(filename, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            # empty file can't be memory mapped
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from sbfBlocks(data, keep=keep)
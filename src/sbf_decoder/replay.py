@@ -0,0 +1,211 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import sys
+import mmap
+import itertools
+import time
+import random
+import socket
+import struct
+import argparse
+from sbf_decoder.sbf_decoder import sbfFrames, HEADER_LEN
+
+# TOW / WNc do-not-use values
+TOW_DNU = 4294967295
+WNC_DNU = 65535
+
+
+def replayPackets(buf, speed=1.0, packet_size=None, corrupt_prob=0.0, loop=False, rng=None):
+    """
+    cut the valid sbf blocks of a recording into timed packets
+
+    :param buf: recorded sbf bytes (bytes, mmap, ...)
+    :param speed: replay speed factor on the block TOW, 1.0 is real time; None / 0 for max rate
+    :param packet_size: bytes per packet, blocks are split / merged; None sends one block per packet
+    :param corrupt_prob: probability to flip one byte of a block (header or body)
+    :param loop: restart at the beginning at the end of the recording
+    :param rng: random.Random used for the corruption
+    :return: generator; send time in seconds after the first packet, packet bytes, number of blocks
+    :raise ValueError: if packet_size is not positive
+    """
+    if packet_size is not None and packet_size < 1:
+        raise ValueError(f'packet size must be at least 1 byte, got {packet_size}')
+
+    return _replayPackets(buf, speed, packet_size, corrupt_prob, loop, rng or random.Random())
+
+
+def _replayPackets(buf, speed, packet_size, corrupt_prob, loop, rng):
+    """ replayPackets generator, the arguments are checked """
+    t_offset = 0.0
+    t = 0.0
+
+    while True:
+        t0 = None
+        pending = bytearray()
+        pending_blocks = 0
+        n_blocks = 0
+
+        for start, msg_len, _ in sbfFrames(buf):
+            n_blocks += 1
+            # every sbf block body starts with TOW: u4 and WNc: u2
+            tow, wnc = struct.unpack_from('<IH', buf, start + HEADER_LEN)
+            if speed and tow != TOW_DNU and wnc != WNC_DNU:
+                gps_seconds = wnc * 604800 + tow / 1000
+                if t0 is None:
+                    t0 = gps_seconds
+                # never go back in time, e.g. blocks not sorted by TOW
+                t = max(t, t_offset + (gps_seconds - t0) / speed)
+
+            block = bytearray(buf[start:start + msg_len])
+            if corrupt_prob and rng.random() < corrupt_prob:
+                i = rng.randrange(len(block))
+                block[i] ^= 1 << rng.randrange(8)
+
+            if packet_size is None:
+                yield t, bytes(block), 1
+                continue
+
+            pending += block
+            pending_blocks += 1
+            while len(pending) >= packet_size:
+                yield t, bytes(pending[:packet_size]), pending_blocks
+                del pending[:packet_size]
+                pending_blocks = 0
+
+        if pending:
+            yield t, bytes(pending), pending_blocks
+
+        if not loop or n_blocks == 0:
+            return
+        t_offset = t
+
+
+def sendPackets(conn: socket.socket, packets, disconnect_prob=0.0, rng=None, paced=True):
+    """
+    send timed packets to a connected client
+
+    :param conn: connected socket
+    :param packets: replayPackets generator, continued where a previous client stopped
+    :param disconnect_prob: probability to close the connection after a packet
+    :param paced: wait for the packet send times; False sends at max rate (speed 0)
+    :return: stats dictionary, reason the replay stopped, the packet taken from packets
+             that could not be sent (None if all were sent);
+             stats['max_lag'] is the max delay behind the send times in seconds, None if not paced
+    """
+    rng = rng or random.Random()
+    stats = {'blocks': 0, 'bytes': 0, 'packets': 0, 'max_lag': 0.0 if paced else None}
+    start = time.perf_counter()
+    base = None
+    reason = 'end of file'
+    unsent = None
+
+    for t, packet, n_blocks in packets:
+        if paced:
+            now = time.perf_counter()
+            if base is None:
+                base = now - t
+            delay = base + t - now
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                stats['max_lag'] = max(stats['max_lag'], -delay)
+
+        try:
+            conn.sendall(packet)
+        except OSError:
+            reason = 'client closed'
+            unsent = t, packet, n_blocks
+            break
+
+        stats['blocks'] += n_blocks
+        stats['bytes'] += len(packet)
+        stats['packets'] += 1
+
+        if disconnect_prob and rng.random() < disconnect_prob:
+            reason = 'disconnect injected'
+            break
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = elapsed
+    stats['blocks_per_second'] = stats['blocks'] / elapsed if elapsed > 0 else 0.0
+    stats['mb_per_second'] = stats['bytes'] / 1e6 / elapsed if elapsed > 0 else 0.0
+
+    return stats, reason, unsent
+
+
+def serveReplay(server: socket.socket, buf, speed=1.0, packet_size=None, corrupt_prob=0.0,
+                disconnect_prob=0.0, loop=False, seed=None, log=print):
+    """
+    replay a recording to the clients of a listening socket, one client at a time;
+    a new client continues the replay where the previous one stopped, starting
+    with the packet the previous client did not receive
+
+    :param server: listening tcp socket
+    :param buf: recorded sbf bytes
+    :param speed: replay speed factor, None / 0 for max rate, see replayPackets
+    :param packet_size: bytes per packet, None for one block per packet
+    :param corrupt_prob: probability to corrupt a block
+    :param disconnect_prob: probability to drop the client after a packet
+    :param loop: replay the recording endlessly
+    :param seed: random seed of the corruption / disconnect injection
+    :param log: progress output function
+    :return: list of per connection stats
+    """
+    rng = random.Random(seed)
+    packets = replayPackets(buf, speed=speed, packet_size=packet_size, corrupt_prob=corrupt_prob, loop=loop, rng=rng)
+    all_stats = []
+    unsent = None
+
+    while True:
+        conn, address = server.accept()
+        client_packets = packets if unsent is None else itertools.chain([unsent], packets)
+        with conn:
+            stats, reason, unsent = sendPackets(conn, client_packets, disconnect_prob=disconnect_prob, rng=rng,
+                                                paced=bool(speed))
+
+        all_stats.append(stats)
+        max_lag = 'n/a' if stats['max_lag'] is None else f'{stats["max_lag"] * 1000:.1f} ms'
+        log(f'{address[0]}:{address[1]}: {reason}; {stats["blocks"]} blocks, {stats["bytes"] / 1e6:.2f} MB '
+            f'in {stats["seconds"]:.2f} s ({stats["blocks_per_second"]:.0f} blocks/s, '
+            f'{stats["mb_per_second"]:.2f} MB/s, max lag {max_lag})')
+
+        if reason == 'end of file':
+            return all_stats
+
+
+def _packetSize(value):
+    """ argparse type of --packet-size """
+    size = int(value)
+    if size < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1 byte, got {value}')
+    return size
+
+
+def main(argv=None):
+    """ command line: serve a recorded .sbf file on a local tcp port """
+    parser = argparse.ArgumentParser(description='replay a recorded .sbf file over tcp')
+    parser.add_argument('file', help='.sbf log file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=0, help='tcp port, default: any free port')
+    parser.add_argument('-s', '--speed', type=float, default=1.0, help='speed factor on TOW, 0 for max rate')
+    parser.add_argument('--packet-size', type=_packetSize, default=None, help='bytes per packet, default: one block')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='probability to corrupt a block')
+    parser.add_argument('--disconnect', type=float, default=0.0, help='probability to disconnect after a packet')
+    parser.add_argument('--loop', action='store_true', help='replay endlessly')
+    parser.add_argument('--seed', type=int, default=None, help='random seed of the injection')
+    args = parser.parse_args(argv)
+
+    with open(args.file, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf, \
+            socket.create_server((args.host, args.port)) as server:
+        print(f'replaying {args.file} on {args.host}:{server.getsockname()[1]}', file=sys.stderr)
+        serveReplay(server, buf, speed=args.speed, packet_size=args.packet_size, corrupt_prob=args.corrupt,
+                    disconnect_prob=args.disconnect, loop=args.loop, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
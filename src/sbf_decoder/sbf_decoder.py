@@ -5,37 +5,114 @@
 '''
 
 import struct
+from binascii import crc_hqx
 from sbf_decoder.blocks import BLOCK_NUMBERS, BLOCK_NAMES, BODY_PARSERS
-from gps_time import GPSTime
-from datetime import timezone
-import numpy as np
+from datetime import datetime, timedelta, timezone
 import sbf_decoder.body_parser as body_parser
 
 HEADER_LEN = 8
+SYNC = b'$@'
 name_paser_dict = dict(zip(BLOCK_NAMES, BODY_PARSERS))
 num_name_dict = dict(zip(BLOCK_NUMBERS, BLOCK_NAMES))
 
+# GPS time has no leap seconds, WNc + TOW are counted from this epoch
+GPS_EPOCH = datetime(1980, 1, 6, tzinfo=timezone.utc)
+
 
 def gpsTime2Utc(tow: int, wnc: int):
     """ GPS time to Utc Unix epochs in Milliseconds """
-    gps_time_obj = GPSTime(week_number=wnc, time_of_week=tow / 1000)
-    gps_time_obj = gps_time_obj.to_datetime().replace(tzinfo=timezone.utc)
+    gps_time_obj = GPS_EPOCH + timedelta(days=wnc * 7) + timedelta(seconds=tow / 1000)
 
     return gps_time_obj.strftime("%d/%m/%Y-%H:%M:%S"), gps_time_obj.timestamp() * 1000
 
 
 def crc_ccitt(data, size, initial_value):
-    """CRC check"""
-    crc = initial_value
-    for i in range(size):
-        crc ^= (data[i] << 8)
-        for j in range(8):
-            if crc & 0x8000:
-                crc = (crc << 1) ^ 0x1021
-            else:
-                crc <<= 1
-            crc &= 0xFFFF
-    return crc
+    """CRC check, CRC-CCITT (poly 0x1021) as computed by binascii.crc_hqx"""
+    return crc_hqx(bytes(data[:size]), initial_value)
+
+
+def parseBlock(blockno: int, msg_body: bytes):
+    """
+    parse one sbf block body
+
+    :param blockno: block number, ID & 0x1fff
+    :param msg_body: block body without the 8 bytes header
+    :return: blockname, block_dict; (False, None) for unknown block numbers
+    """
+    blockname = num_name_dict.get(blockno, False)
+    if not blockname:
+        return False, None
+
+    parser_name = name_paser_dict.get(blockname)
+    blockPaser = getattr(body_parser, parser_name)
+
+    block_dict = blockPaser(msg_body)
+
+    # convert WNc + TOW to utc and unix epoch in milliseconds
+    if block_dict:
+        block_dict['utc'], block_dict['ts'] = gpsTime2Utc(tow=block_dict['TOW'], wnc=block_dict['WNc'])
+
+    return blockname, block_dict
+
+
+def sbfFrames(buf, pos=0):
+    """
+    scan a buffer for complete sbf blocks with a valid crc,
+    bytes before a sync pattern or in blocks with a wrong crc are skipped
+
+    Incomplete blocks at the end of the buffer are not yielded, a stream reader
+    keeps the buffer from the first sync after the last yielded block and
+    continues once more bytes are received.
+
+    :param buf: bytes, bytearray, mmap, ...
+    :param pos: start offset
+    :return: generator; block start offset, block length, block number
+    """
+    with memoryview(buf) as view:
+        end = len(view)
+        while True:
+            start = buf.find(SYNC, pos)
+            if start < 0 or end - start < HEADER_LEN:
+                return
+
+            # sync, crc, id, length
+            crc, id, msg_len = struct.unpack_from('<HHH', view, start + 2)
+            if msg_len <= HEADER_LEN or msg_len % 4 != 0:
+                pos = start + 1
+                continue
+
+            if start + msg_len > end:
+                # incomplete block, or a false sync: keep looking for complete blocks
+                pos = start + 1
+                continue
+
+            # crc over ID, Length and the body
+            if crc_hqx(view[start + 4:start + msg_len], 0) != crc:
+                pos = start + 1
+                continue
+
+            yield start, msg_len, id & 0x1fff
+            pos = start + msg_len
+
+
+def sbfBlocks(buf, pos=0, keep=None):
+    """
+    decode all complete sbf blocks in a buffer
+
+    :param buf: bytes, bytearray, mmap, ...
+    :param pos: start offset
+    :param keep: optional keep(blockno, TOW, WNc) -> bool, called before a block
+                 is parsed, e.g. decimate.BlockDecimator
+    :return: generator; sbf-blockname + sbf-block dictionary
+    """
+    for start, msg_len, blockno in sbfFrames(buf, pos):
+        # every sbf block body starts with TOW: u4 and WNc: u2
+        if keep is not None and not keep(blockno, *struct.unpack_from('<IH', buf, start + HEADER_LEN)):
+            continue
+
+        blockname, block_dict = parseBlock(blockno, buf[start + HEADER_LEN:start + msg_len])
+        if block_dict:
+            yield blockname, block_dict
 
 
 def sbfDecoder(msg: bytes, is_online=True):
@@ -84,23 +161,14 @@ def sbfDecoder(msg: bytes, is_online=True):
             body_crc = crc_ccitt(msg_body, body_len, crc_init)
 
             if crc == body_crc:
-                blockno = id & 0x1fff
-                blockname = num_name_dict.get(blockno, False)
+                blockname, block_dict = parseBlock(id & 0x1fff, msg_body)
 
                 if not blockname:
                     # unknown block number
                     del msg[:header_msg_len]
                     return
 
-                parser_name = name_paser_dict.get(blockname)
-                blockPaser = getattr(body_parser, parser_name)
-
-                block_dict = blockPaser(msg_body)
-
-                # convert WNc + TOW to utc and unix epoch in milliseconds
                 if block_dict:
-                    block_dict['utc'], block_dict['ts'] = gpsTime2Utc(tow=block_dict['TOW'], wnc=block_dict['WNc'])
-
                     yield blockname, block_dict
 
                 # only for real-time, one package has multi-blocks
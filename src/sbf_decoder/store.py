@@ -0,0 +1,240 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import threading
+import numpy as np
+from sbf_decoder.body_parser import ins_sb_dict
+from sbf_decoder.columns import flattenBlock
+from sbf_decoder.decimate import TOW_DNU, WNC_DNU
+
+# ring buffer columns per block type, names as produced by columns.flattenBlock
+_TIME_COLUMNS = {'ts': np.float64, 'TOW': np.int64, 'WNc': np.int64}
+_INS_SB_COLUMNS = {f'{name}_{i}': np.float32 for name in ins_sb_dict.values() for i in range(3)}
+_INS_COLUMNS = {
+    'GNSSMode': np.int64, 'Error': np.int64, 'Info': np.int64, 'GNSSAge': np.int64,
+    'Accuracy': np.int64, 'Latency': np.int64, 'Datum': 'U32',
+}
+
+DEFAULT_SCHEMAS = {
+    'INSNavGeod': {
+        **_TIME_COLUMNS, **_INS_COLUMNS,
+        'Latitude': np.float64, 'Longitude': np.float64, 'Height': np.float64, 'Undulation': np.float32,
+        **_INS_SB_COLUMNS,
+    },
+    'INSNavCart': {
+        **_TIME_COLUMNS, **_INS_COLUMNS,
+        'pos_0': np.float64, 'pos_1': np.float64, 'pos_2': np.float64,
+        **_INS_SB_COLUMNS,
+    },
+    'ExtSensorMeas': {
+        **_TIME_COLUMNS,
+        'acc_x': np.float64, 'acc_y': np.float64, 'acc_z': np.float64,
+        'angular_rate_x': np.float64, 'angular_rate_y': np.float64, 'angular_rate_z': np.float64,
+        'sensor_temperature': np.float64,
+        'velocity_x': np.float64, 'velocity_y': np.float64, 'velocity_z': np.float64,
+        'std_dev_x': np.float64, 'std_dev_y': np.float64, 'std_dev_z': np.float64,
+        'flag': np.float64,
+    },
+    'BaseStation': {
+        **_TIME_COLUMNS,
+        'BaseStationID': np.int64, 'BaseType': 'U16', 'Source_0': np.int64, 'Source_1': 'U32',
+        'X': np.float64, 'Y': np.float64, 'Z': np.float64,
+    },
+}
+
+# 10 minutes of 200 Hz data
+DEFAULT_CAPACITY = 200 * 600
+
+
+class RingBuffer:
+    """
+    fixed-capacity ring buffer of preallocated NumPy columns
+
+    Rows are stored in ts order (non-decreasing), the oldest row is overwritten
+    once the buffer is full. The stored rows are two sorted segments of the
+    arrays, so time range queries are binary searches and return copies of the
+    selected rows only. Rows that would break the order are not stored but
+    counted in skipped: rows without a valid ts, with a do-not-use TOW / WNc
+    and rows older than the last stored row.
+    """
+
+    def __init__(self, schema: dict, capacity=DEFAULT_CAPACITY):
+        """
+        :param schema: {column: dtype}, must contain 'ts'
+        :param capacity: max number of rows
+        """
+        if 'ts' not in schema:
+            raise ValueError("schema needs a 'ts' column")
+
+        self.capacity = capacity
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in schema.items()}
+        self.head = 0
+        self.count = 0
+        self.last_ts = -np.inf
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+        # (column, array, value for missing fields)
+        self._fills = []
+        for name, values in self.columns.items():
+            if values.dtype.kind == 'f':
+                fill = np.nan
+            elif values.dtype.kind in 'US':
+                fill = ''
+            else:
+                fill = -1
+            self._fills.append((name, values, fill))
+
+    def __len__(self):
+        return self.count
+
+    def append(self, flat: dict):
+        """
+        append one flat row (see columns.flattenBlock), unknown fields are ignored
+
+        :return: True if stored, False if skipped (see RingBuffer)
+        """
+        ts = flat.get('ts')
+        with self.lock:
+            # not ts >= last_ts is also True for nan
+            if ts is None or not ts >= self.last_ts or \
+                    flat.get('TOW') == TOW_DNU or flat.get('WNc') == WNC_DNU:
+                self.skipped += 1
+                return False
+
+            head = self.head
+            for name, values, fill in self._fills:
+                values[head] = flat.get(name, fill)
+
+            self.last_ts = ts
+            self.head = (head + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            return True
+
+    def _segments(self):
+        """ (start, stop) array slices holding the rows, oldest first """
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return [(start, start + self.count)]
+        return [(start, self.capacity), (0, self.head)]
+
+    def _take(self, slices, columns):
+        names = columns or list(self.columns)
+        return {
+            name: np.concatenate([self.columns[name][a:b] for a, b in slices]) if slices
+            else self.columns[name][:0].copy()
+            for name in names
+        }
+
+    def latest(self, k: int, columns=None):
+        """
+        :param k: number of rows
+        :param columns: column names, None for all
+        :return: {column: np.ndarray} of the newest k rows, oldest first
+        """
+        with self.lock:
+            k = min(k, self.count)
+            slices = []
+            for a, b in reversed(self._segments()):
+                if k <= 0:
+                    break
+                n = min(k, b - a)
+                slices.insert(0, (b - n, b))
+                k -= n
+            return self._take(slices, columns)
+
+    def range(self, t_start, t_end, columns=None):
+        """
+        :param t_start, t_end: ts range in milliseconds, both included
+        :param columns: column names, None for all
+        :return: {column: np.ndarray} of the rows with t_start <= ts <= t_end
+        """
+        with self.lock:
+            ts = self.columns['ts']
+            slices = []
+            for a, b in self._segments():
+                lo = a + np.searchsorted(ts[a:b], t_start, side='left')
+                hi = a + np.searchsorted(ts[a:b], t_end, side='right')
+                if hi > lo:
+                    slices.append((lo, hi))
+            return self._take(slices, columns)
+
+    def snapshot(self, columns=None):
+        """
+        :param columns: column names, None for all
+        :return: {column: np.ndarray} copy of all rows, oldest first
+        """
+        with self.lock:
+            return self._take(self._segments() if self.count else [], columns)
+
+
+class RingStore:
+    """
+    in-memory time-series store, one RingBuffer per block type
+
+    Usage:
+        store = RingStore(capacities={'INSNavGeod': 6000, 'ExtSensorMeas': 120000})
+        threading.Thread(target=store.consume, args=(readSbfDataStream(ip, port),), daemon=True).start()
+        store.range('INSNavGeod', t_start, t_end)['Latitude']
+        store.latest('ExtSensorMeas', 200)
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, capacities=None, schemas=None):
+        """
+        :param capacity: rows per block type
+        :param capacities: {blockname: rows}, overrides capacity
+        :param schemas: {blockname: {column: dtype}}, default DEFAULT_SCHEMAS;
+                        blocks of other types are not stored
+        """
+        schemas = DEFAULT_SCHEMAS if schemas is None else schemas
+        capacities = capacities or {}
+        self.buffers = {
+            blockname: RingBuffer(schema, capacities.get(blockname, capacity))
+            for blockname, schema in schemas.items()
+        }
+
+    def append(self, blockname: str, block_dict: dict):
+        """
+        :return: True if the block is stored; False for other block types and
+                 skipped blocks, see RingBuffer
+        """
+        buffer = self.buffers.get(blockname)
+        if buffer is None:
+            return False
+        return buffer.append(flattenBlock(blockname, block_dict))
+
+    def consume(self, blocks):
+        """
+        store every block of a decoder generator, e.g. readSbfDataStream output
+
+        The blocks of each type must arrive in time order, as a receiver streams
+        them. Blocks with a do-not-use TOW / WNc and blocks older than the last
+        stored block of their type are not stored, see RingBuffer.skipped.
+
+        :param blocks: iterable of (blockname, block_dict)
+        :return: number of stored blocks, when the iterable ends
+        """
+        stored = 0
+        for blockname, block_dict in blocks:
+            stored += self.append(blockname, block_dict)
+        return stored
+
+    def latest(self, blockname: str, k: int, columns=None):
+        """ newest k rows of a block type, see RingBuffer.latest """
+        return self.buffers[blockname].latest(k, columns)
+
+    def range(self, blockname: str, t_start, t_end, columns=None):
+        """ rows of a block type in a ts range, see RingBuffer.range """
+        return self.buffers[blockname].range(t_start, t_end, columns)
+
+    def snapshot(self, blockname: str, columns=None):
+        """ all rows of a block type, see RingBuffer.snapshot """
+        return self.buffers[blockname].snapshot(columns)
+
+    def nbytes(self):
+        """ preallocated memory of all buffers in bytes """
+        return sum(values.nbytes for buffer in self.buffers.values() for values in buffer.columns.values())
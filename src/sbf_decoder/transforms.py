@@ -0,0 +1,238 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+from sbf_decoder.body_parser import datum_dict
+
+# ellipsoid: (semi-major axis in meter, flattening)
+ELLIPSOIDS = {
+    'WGS84': (6378137.0, 1 / 298.257223563),
+    'GRS80': (6378137.0, 1 / 298.257222101),
+}
+
+# decoded INSNavCart datum name -> ellipsoid
+# base station and user-defined datums are unknown to the decoder, WGS84 is assumed
+DATUM_ELLIPSOIDS = {
+    datum_dict[0]: 'WGS84',
+    datum_dict[19]: 'WGS84',
+    datum_dict[30]: 'GRS80',
+    datum_dict[31]: 'GRS80',
+    datum_dict[32]: 'GRS80',
+    datum_dict[33]: 'GRS80',
+    datum_dict[34]: 'GRS80',
+    datum_dict[35]: 'GRS80',
+    datum_dict[36]: 'GRS80',
+    datum_dict[250]: 'WGS84',
+    datum_dict[251]: 'WGS84',
+}
+
+
+def ellipsoidParams(datum='WGS84/ITRS'):
+    """
+    ellipsoid parameters of a datum
+
+    :param datum: decoded datum name (see body_parser.Datum) or ellipsoid name
+    :return: a, b, e2 (first eccentricity squared), ep2 (second eccentricity squared)
+    """
+    name = DATUM_ELLIPSOIDS.get(datum, datum)
+    if name not in ELLIPSOIDS:
+        raise ValueError(f"unknown datum '{datum}'")
+
+    a, f = ELLIPSOIDS[name]
+    b = a * (1 - f)
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+
+    return a, b, e2, ep2
+
+
+def ecef2Geodetic(x, y, z, datum='WGS84/ITRS'):
+    """
+    ECEF to geodetic coordinates, vectorized closed form (Heikkinen)
+
+    :param x, y, z: ECEF coordinates in meter, scalars or arrays
+    :param datum: decoded datum name or ellipsoid name
+    :return: latitude, longitude in degree, height in meter
+    """
+    a, b, e2, ep2 = ellipsoidParams(datum)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+
+    p2 = x * x + y * y
+    p = np.sqrt(p2)
+    z2 = z * z
+
+    F = 54 * b * b * z2
+    G = p2 + (1 - e2) * z2 - e2 * (a * a - b * b)
+    c = e2 * e2 * F * p2 / (G * G * G)
+    s = np.cbrt(1 + c + np.sqrt(c * c + 2 * c))
+    k = s + 1 + 1 / s
+    P = F / (3 * k * k * G * G)
+    Q = np.sqrt(1 + 2 * e2 * e2 * P)
+    r0 = -P * e2 * p / (1 + Q) + np.sqrt(np.maximum(
+        a * a / 2 * (1 + 1 / Q) - P * (1 - e2) * z2 / (Q * (1 + Q)) - P * p2 / 2, 0))
+    t = p - e2 * r0
+    U = np.sqrt(t * t + z2)
+    V = np.sqrt(t * t + (1 - e2) * z2)
+    z0 = b * b * z / (a * V)
+
+    height = U * (1 - b * b / (a * V))
+    latitude = np.degrees(np.arctan2(z + ep2 * z0, p))
+    longitude = np.degrees(np.arctan2(y, x))
+
+    return latitude, longitude, height
+
+
+def geodetic2Ecef(latitude, longitude, height, datum='WGS84/ITRS'):
+    """
+    geodetic to ECEF coordinates, vectorized
+
+    :param latitude, longitude: in degree, scalars or arrays
+    :param height: ellipsoidal height in meter
+    :param datum: decoded datum name or ellipsoid name
+    :return: x, y, z in meter
+    """
+    a, _, e2, _ = ellipsoidParams(datum)
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    height = np.asarray(height, dtype=np.float64)
+
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = a / np.sqrt(1 - e2 * sin_lat * sin_lat)
+
+    x = (n + height) * cos_lat * np.cos(lon)
+    y = (n + height) * cos_lat * np.sin(lon)
+    z = (n * (1 - e2) + height) * sin_lat
+
+    return x, y, z
+
+
+def ecef2Enu(x, y, z, ref_x, ref_y, ref_z, datum='WGS84/ITRS'):
+    """
+    ECEF to local east / north / up relative to a reference ECEF point
+
+    :param x, y, z: ECEF coordinates in meter, scalars or arrays
+    :param ref_x, ref_y, ref_z: reference point (e.g. base station), scalars or
+                                arrays broadcastable to x, y, z
+    :param datum: decoded datum name or ellipsoid name
+    :return: east, north, up in meter
+    """
+    ref_lat, ref_lon, _ = ecef2Geodetic(ref_x, ref_y, ref_z, datum)
+    lat = np.radians(ref_lat)
+    lon = np.radians(ref_lon)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+
+    dx = np.asarray(x, dtype=np.float64) - ref_x
+    dy = np.asarray(y, dtype=np.float64) - ref_y
+    dz = np.asarray(z, dtype=np.float64) - ref_z
+
+    east = -sin_lon * dx + cos_lon * dy
+    north = -sin_lat * cos_lon * dx - sin_lat * sin_lon * dy + cos_lat * dz
+    up = cos_lat * cos_lon * dx + cos_lat * sin_lon * dy + sin_lat * dz
+
+    return east, north, up
+
+
+def enu2Ecef(east, north, up, ref_x, ref_y, ref_z, datum='WGS84/ITRS'):
+    """
+    local east / north / up relative to a reference ECEF point to ECEF
+
+    :return: x, y, z in meter
+    """
+    ref_lat, ref_lon, _ = ecef2Geodetic(ref_x, ref_y, ref_z, datum)
+    lat = np.radians(ref_lat)
+    lon = np.radians(ref_lon)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+
+    east = np.asarray(east, dtype=np.float64)
+    north = np.asarray(north, dtype=np.float64)
+    up = np.asarray(up, dtype=np.float64)
+
+    x = ref_x - sin_lon * east - sin_lat * cos_lon * north + cos_lat * cos_lon * up
+    y = ref_y + cos_lon * east - sin_lat * sin_lon * north + cos_lat * sin_lon * up
+    z = ref_z + cos_lat * north + sin_lat * up
+
+    return x, y, z
+
+
+def insNavCartGeodetic(columns: dict):
+    """
+    latitude / longitude / height of INSNavCart columns (see columns.blocksToColumns),
+    each row is converted with the ellipsoid of its own Datum
+
+    :param columns: INSNavCart {column: np.ndarray}
+    :return: latitude, longitude in degree, height in meter
+    """
+    x, y, z = columns['pos_0'], columns['pos_1'], columns['pos_2']
+    datums = columns.get('Datum')
+    if datums is None:
+        return ecef2Geodetic(x, y, z)
+
+    latitude = np.empty(x.size)
+    longitude = np.empty(x.size)
+    height = np.empty(x.size)
+    for datum in np.unique(datums):
+        rows = datums == datum
+        if datum not in DATUM_ELLIPSOIDS:
+            # "UNKNOW COORDINATES"
+            latitude[rows] = longitude[rows] = height[rows] = np.nan
+            continue
+        latitude[rows], longitude[rows], height[rows] = ecef2Geodetic(x[rows], y[rows], z[rows], datum)
+
+    return latitude, longitude, height
+
+
+def baseStationBaselines(blocks, datum='WGS84/ITRS'):
+    """
+    ENU baseline of every INSNavCart position relative to the latest BaseStation
+    block received before it
+
+    :param blocks: iterable of (blockname, block_dict), e.g. sbfDecoder output
+    :param datum: datum used for the local frame of the base station
+    :return: dict of arrays: ts, TOW, WNc, BaseStationID, east, north, up;
+             positions without a preceding BaseStation get nan / -1
+    """
+    ts, tow, wnc, pos, base_index = [], [], [], [], []
+    base_pos, base_id = [], []
+
+    for blockname, block_dict in blocks:
+        if blockname == 'BaseStation':
+            base_pos.append((block_dict['X'], block_dict['Y'], block_dict['Z']))
+            base_id.append(block_dict['BaseStationID'])
+        elif blockname == 'INSNavCart':
+            ts.append(block_dict['ts'])
+            tow.append(block_dict['TOW'])
+            wnc.append(block_dict['WNc'])
+            pos.append(block_dict['pos'])
+            base_index.append(len(base_pos) - 1)
+
+    pos = np.array(pos, dtype=np.float64).reshape(-1, 3)
+    base_index = np.array(base_index, dtype=np.int64)
+    base_pos = np.array(base_pos, dtype=np.float64).reshape(-1, 3)
+    base_id = np.array(base_id, dtype=np.int64)
+
+    has_base = base_index >= 0
+    ref = np.full(pos.shape, np.nan)
+    ids = np.full(base_index.size, -1, dtype=np.int64)
+    if base_pos.size:
+        ref[has_base] = base_pos[base_index[has_base]]
+        ids[has_base] = base_id[base_index[has_base]]
+
+    east, north, up = ecef2Enu(pos[:, 0], pos[:, 1], pos[:, 2], ref[:, 0], ref[:, 1], ref[:, 2], datum)
+
+    return {
+        'ts': np.array(ts, dtype=np.float64),
+        'TOW': np.array(tow, dtype=np.int64),
+        'WNc': np.array(wnc, dtype=np.int64),
+        'BaseStationID': ids,
+        'east': east,
+        'north': north,
+        'up': up,
+    }
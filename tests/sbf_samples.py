@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+#################################################
+### synthetic sbf blocks for the tests
+#################################################
+
+import math
+import struct
+from binascii import crc_hqx
+
+# ExtSensorMeas sub-block types
+ACCELERATION = 0
+ANGULAR_RATE = 1
+INFO = 3
+VELOCITY = 4
+ZERO_VELOCITY_FLAG = 20
+
+
+def sbfBlock(blockno: int, body: bytes):
+    """ sbf block with header and crc; the body is padded to a multiple of 4 bytes """
+    body += b'\x00' * (-(len(body) + 8) % 4)
+    id_length = struct.pack('<HH', blockno, len(body) + 8)
+    crc = crc_hqx(id_length + body, 0)
+    return b'$@' + struct.pack('<H', crc) + id_length + body
+
+
+def insNavGeod(tow, wnc=2200, lat=48.1, lon=11.5, height=520.0, sub_blocks=None, datum=0):
+    """
+    INSNavGeod block
+
+    :param sub_blocks: {bit index (see body_parser.INS_SB): (f4, f4, f4)}
+    """
+    sub_blocks = sub_blocks or {}
+    sb_list = sum(1 << bit for bit in sub_blocks)
+    body = struct.pack('<IHBBHHdddfHHBBH', tow, wnc, 4, 0, 0, 10,
+                       math.radians(lat), math.radians(lon), height, 47.5, 12, 30, datum, 0, sb_list)
+    for bit in sorted(sub_blocks):
+        body += struct.pack('<fff', *sub_blocks[bit])
+    return sbfBlock(4226, body)
+
+
+def insNavCart(tow, wnc=2200, pos=(4177000.0, 855000.0, 4727000.0), sub_blocks=None, datum=0):
+    """
+    INSNavCart block
+
+    :param sub_blocks: {bit index (see body_parser.INS_SB): (f4, f4, f4)}
+    """
+    sub_blocks = sub_blocks or {}
+    sb_list = sum(1 << bit for bit in sub_blocks)
+    body = struct.pack('<IHBBHHdddHHBBH', tow, wnc, 4, 0, 0, 10, *pos, 12, 30, datum, 0, sb_list)
+    for bit in sorted(sub_blocks):
+        body += struct.pack('<fff', *sub_blocks[bit])
+    return sbfBlock(4225, body)
+
+
+def extSensorMeas(tow, wnc=2200, sub_blocks=((ACCELERATION, 0, (0.1, 0.2, 9.81)),)):
+    """
+    ExtSensorMeas block
+
+    :param sub_blocks: (Type, Source, values), values as unpacked by body_parser.extSensorMeasParser
+    """
+    sb_len = 32
+    body = struct.pack('<IHBB', tow, wnc, len(sub_blocks), sb_len)
+    for sb_type, source, values in sub_blocks:
+        sub_block = struct.pack('<BBBB', source, 1, sb_type, 0)
+        if sb_type in (ACCELERATION, ANGULAR_RATE):
+            sub_block += struct.pack('<ddd', *values)
+        elif sb_type == INFO:
+            sub_block += struct.pack('<hB', *values, 0)
+        elif sb_type == VELOCITY:
+            sub_block += struct.pack('<llllll', *values)
+        elif sb_type == ZERO_VELOCITY_FLAG:
+            sub_block += struct.pack('<dB', *values, 0)
+        body += sub_block.ljust(sb_len, b'\x00')
+    return sbfBlock(4050, body)
+
+
+def baseStation(tow, wnc=2200, station_id=7, base_type=0, source=8, xyz=(4177000.0, 855000.0, 4727000.0)):
+    """ BaseStation block """
+    body = struct.pack('<IHHBBBBddd', tow, wnc, station_id, base_type, source, 255, 0, *xyz)
+    return sbfBlock(5949, body)
+
+
+def diffCorrIn(tow, wnc=2200, mode=2, source=9):
+    """ DiffCorrIn block with a one byte message """
+    body = struct.pack('<IHBBB', tow, wnc, mode, source, 0xd3)
+    return sbfBlock(5919, body)
+
+
+def rtcmDatum(tow, wnc=2200, source='ITRF2014', target='ETRS89', datum=3):
+    """ RTCMDatum block; datum 255 is decoded as a text message """
+    body = struct.pack('<IH32s32sBBB', tow, wnc, source.encode(), target.encode(), datum, 0, 0x21)
+    return sbfBlock(4049, body)
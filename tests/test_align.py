@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.sbf_decoder import sbfBlocks
+from sbf_decoder.align import alignColumns, alignBlockStreams
+
+REF_TIMES = np.array([0.0, 10.0, 14.0, 26.0, 40.0])
+SRC_TIMES = np.array([5.0, 15.0, 25.0])
+SRC_COLUMNS = {'x': np.array([1.0, 2.0, 3.0]), 'n': np.array([10, 20, 30]), 'name': np.array(['a', 'b', 'c'])}
+
+
+def test_nearest():
+    aligned = alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode='nearest')
+    np.testing.assert_array_equal(aligned['x'], [1.0, 1.0, 2.0, 3.0, 3.0])
+    np.testing.assert_array_equal(aligned['n'], [10, 10, 20, 30, 30])
+    np.testing.assert_array_equal(aligned['name'], ['a', 'a', 'b', 'c', 'c'])
+
+
+def test_previous():
+    aligned = alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode='previous')
+    # no source sample before t=0
+    np.testing.assert_array_equal(aligned['x'], [np.nan, 1.0, 1.0, 3.0, 3.0])
+    np.testing.assert_array_equal(aligned['n'], [np.nan, 10, 10, 30, 30])
+    np.testing.assert_array_equal(aligned['name'], ['', 'a', 'a', 'c', 'c'])
+
+
+def test_linear():
+    aligned = alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode='linear')
+    # nan outside of the source time span
+    np.testing.assert_allclose(aligned['x'], [np.nan, 1.5, 1.9, np.nan, np.nan])
+    np.testing.assert_allclose(aligned['n'], [np.nan, 15.0, 19.0, np.nan, np.nan])
+    # text is taken from the previous sample
+    np.testing.assert_array_equal(aligned['name'], ['', 'a', 'a', 'c', 'c'])
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('nearest', [1.0, 1.0, 2.0, 3.0, np.nan]),
+    ('previous', [np.nan, 1.0, np.nan, 3.0, np.nan]),
+    # t=14 is 9 ms after the previous sample
+    ('linear', [np.nan, 1.5, np.nan, np.nan, np.nan]),
+])
+def test_tolerance(mode, expected):
+    aligned = alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode=mode, tolerance=5.0)
+    np.testing.assert_allclose(aligned['x'], expected)
+
+    # linear needs both neighbours within the tolerance
+    if mode == 'linear':
+        aligned = alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode=mode, tolerance=4.5)
+        np.testing.assert_allclose(aligned['x'], [np.nan] * 5)
+
+
+def test_nan_samples_are_skipped_per_column():
+    columns = {'x': np.array([1.0, np.nan, 3.0]), 'y': np.array([4.0, 5.0, 6.0])}
+    aligned = alignColumns([15.0], SRC_TIMES, columns, mode='nearest')
+    # 5 and 25 are equally near, the earlier sample is used
+    np.testing.assert_array_equal(aligned['x'], [1.0])
+    np.testing.assert_array_equal(aligned['y'], [5.0])
+
+
+def test_unsorted_source_and_unknown_mode():
+    order = [2, 0, 1]
+    columns = {key: values[order] for key, values in SRC_COLUMNS.items()}
+    aligned = alignColumns(REF_TIMES, SRC_TIMES[order], columns, mode='nearest')
+    np.testing.assert_array_equal(aligned['x'], [1.0, 1.0, 2.0, 3.0, 3.0])
+
+    with pytest.raises(ValueError):
+        alignColumns(REF_TIMES, SRC_TIMES, SRC_COLUMNS, mode='cubic')
+
+
+def test_align_block_streams():
+    buf = bytearray()
+    for i in range(10):
+        buf += sbf.insNavGeod(1000 * i)
+        for j in range(10):
+            tow = 1000 * i + 100 * j + 50
+            buf += sbf.extSensorMeas(tow, sub_blocks=((sbf.ACCELERATION, 0, (tow, 0.0, 9.81)),))
+
+    for time_key in ('ts', 'gps'):
+        aligned = alignBlockStreams(sbfBlocks(bytes(buf)), mode='linear', time_key=time_key)
+        assert len(aligned['time']) == 10
+        # acc_x is the TOW, interpolated onto the INSNavGeod epochs
+        np.testing.assert_allclose(aligned['ExtSensorMeas']['acc_x'][1:], aligned['INSNavGeod']['TOW'][1:])
+        assert np.isnan(aligned['ExtSensorMeas']['acc_x'][0])
@@ -0,0 +1,31 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import os
+import importlib.util
+import sbf_decoder
+
+BENCH_SCRIPT = os.path.join(os.path.dirname(__file__), os.pardir, 'script', 'bench_import.py')
+
+
+def _benchImport():
+    spec = importlib.util.spec_from_file_location('bench_import', BENCH_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_core_import_is_light(monkeypatch):
+    bench_import = _benchImport()
+    # the fresh interpreter imports the same sbf_decoder package
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(sbf_decoder.__file__)))
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+
+    ms, loaded = bench_import.measureImport()
+
+    assert loaded == []
+    # generous limit, the benchmark itself checks 50 ms
+    assert ms < 2000
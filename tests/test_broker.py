@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import math
+import time
+import socket
+import threading
+import sbf_samples as sbf
+from sbf_decoder.broker import SbfBroker, subscribeSbf, subscribeSbfRaw
+
+# base type 7 is not in body_parser.base_type_dict, decoding raises a KeyError
+BLOCKS = [sbf.insNavGeod(0), sbf.baseStation(0, base_type=7), sbf.insNavGeod(100, sub_blocks={1: (1.0, 2.0, 3.0)})]
+
+
+def _waitFor(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timeout'
+        time.sleep(0.01)
+
+
+def _collect(generator, out):
+    for item in generator:
+        out.append(item)
+
+
+def test_broker_survives_undecodable_blocks(tmp_path):
+    receiver = socket.create_server(('127.0.0.1', 0))
+    start_sending = threading.Event()
+
+    def serveReceiver():
+        conn, _ = receiver.accept()
+        with conn:
+            start_sending.wait(5)
+            conn.sendall(b''.join(BLOCKS))
+            time.sleep(0.5)
+
+    threading.Thread(target=serveReceiver, daemon=True).start()
+    logs = []
+    broker = SbfBroker(*receiver.getsockname(), str(tmp_path / 'sbf.sock'), reconnect_delay=0.05, log=logs.append)
+    serving = threading.Thread(target=broker.serveForever)
+    serving.start()
+
+    try:
+        raw, decoded = [], []
+        subscribers = [
+            threading.Thread(target=_collect, args=(subscribeSbfRaw(broker.socket_path), raw)),
+            threading.Thread(target=_collect, args=(subscribeSbf(broker.socket_path), decoded)),
+        ]
+        for subscriber in subscribers:
+            subscriber.start()
+        _waitFor(lambda: len(broker.subscribers) == 2 and all(s['mode'] for s in broker.subscribers.values()))
+
+        start_sending.set()
+        _waitFor(lambda: len(raw) == 3 and len(decoded) == 2)
+    finally:
+        broker.close()
+        serving.join(5)
+        receiver.close()
+
+    for subscriber in subscribers:
+        subscriber.join(5)
+
+    # the undecodable block still reaches the raw subscribers
+    assert raw == BLOCKS
+    assert broker.decode_errors == {5949: 1}
+    assert any('block 5949: decoding failed, KeyError' in msg for msg in logs)
+
+    # nan is sent as json null and restored
+    (name0, block0), (name1, block1) = decoded
+    assert name0 == name1 == 'INSNavGeod'
+    assert math.isnan(block0['Attitude'])
+    assert block1['Attitude'] == [1.0, 2.0, 3.0]
@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import os
+import numpy as np
+import pytest
+import sbf_samples as sbf
+import sbf_decoder.cache
+from sbf_decoder.cache import DecodeCache, META_FILE
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """ log files decoded by the cache """
+    decoded = []
+    blocksToColumns = sbf_decoder.cache.blocksToColumns
+
+    def countingBlocksToColumns(blocks):
+        decoded.append(1)
+        return blocksToColumns(blocks)
+
+    monkeypatch.setattr(sbf_decoder.cache, 'blocksToColumns', countingBlocksToColumns)
+    return decoded
+
+
+def _writeLog(path, tow0=0, n=3):
+    with open(path, 'wb') as f:
+        f.write(b''.join(sbf.insNavGeod(tow0 + 100 * i) + sbf.rtcmDatum(tow0 + 100 * i) for i in range(n)))
+    return str(path)
+
+
+def _setLastUsed(cache, filename, t):
+    os.utime(os.path.join(cache.cache_dir, cache.key(filename), META_FILE), (t, t))
+
+
+def test_hit_is_memory_mapped(tmp_path, decodes):
+    filename = _writeLog(tmp_path / 'x.sbf')
+    cache = DecodeCache(tmp_path / 'cache')
+
+    first = cache.load(filename)
+    second = cache.load(filename)
+    assert len(decodes) == 1
+
+    for columns in (first, second):
+        tow = columns['INSNavGeod']['TOW']
+        assert isinstance(tow, np.memmap)
+        np.testing.assert_array_equal(tow, [0, 100, 200])
+        # text columns are mapped, too
+        crs = columns['RTCMDatum']['SourceCRS']
+        assert isinstance(crs, np.memmap) and crs.dtype.kind == 'U'
+        np.testing.assert_array_equal(crs, ['ITRF2014'] * 3)
+
+    in_memory = cache.load(filename, mmap_mode=None)
+    assert not isinstance(in_memory['INSNavGeod']['TOW'], np.memmap)
+    assert len(decodes) == 1
+
+
+def test_miss_after_a_change(tmp_path, decodes, monkeypatch):
+    filename = _writeLog(tmp_path / 'x.sbf')
+    cache = DecodeCache(tmp_path / 'cache')
+    cache.load(filename)
+
+    # mtime only
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache.load(filename)
+    assert len(decodes) == 2
+
+    # same size and mtime, other content
+    stat = os.stat(filename)
+    _writeLog(filename, tow0=1000)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    np.testing.assert_array_equal(cache.load(filename)['INSNavGeod']['TOW'], [1000, 1100, 1200])
+    assert len(decodes) == 3
+
+    # decoder version
+    monkeypatch.setattr(sbf_decoder.cache, '__version__', 'other')
+    cache.load(filename)
+    assert len(decodes) == 4
+    cache.load(filename)
+    assert len(decodes) == 4
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    a, b, c = (_writeLog(tmp_path / f'{name}.sbf', tow0) for name, tow0 in (('a', 0), ('b', 1000), ('c', 2000)))
+    cache = DecodeCache(tmp_path / 'cache', max_bytes=None)
+    cache.load(a)
+    entry_size = cache.size()
+    cache.load(b)
+    _setLastUsed(cache, a, 1000)
+    _setLastUsed(cache, b, 2000)
+    assert [source for _, _, _, source in cache.entries()] == [a, b]
+
+    # a hit marks a as recently used, b is evicted for c
+    cache.max_bytes = int(2.5 * entry_size)
+    cache.load(a)
+    cache.load(c)
+    assert sorted(source for _, _, _, source in cache.entries()) == [a, c]
+
+    # the new entry is kept even if it does not fit alone
+    cache.max_bytes = 0
+    cache.load(b)
+    assert [source for _, _, _, source in cache.entries()] == [b]
+    assert cache.evict(keep=cache.entries()[0][0]) == 0
+    assert cache.evict() == 1 and cache.size() == 0
+
+
+def test_invalidate_and_clear(tmp_path, decodes):
+    a, b = _writeLog(tmp_path / 'a.sbf'), _writeLog(tmp_path / 'b.sbf', tow0=1000)
+    cache = DecodeCache(tmp_path / 'cache')
+    cache.load(a)
+    # an older entry of a
+    stat = os.stat(a)
+    os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache.load(a)
+    cache.load(b)
+    assert len(cache.entries()) == 3
+
+    assert cache.invalidate(a) == 2
+    assert [source for _, _, _, source in cache.entries()] == [b]
+    cache.load(a)
+    assert len(decodes) == 4
+
+    cache.clear()
+    assert cache.entries() == [] and cache.size() == 0
+    cache.load(b)
+    assert len(decodes) == 5
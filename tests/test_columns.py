@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+import sbf_samples as sbf
+from sbf_decoder.sbf_decoder import sbfBlocks
+from sbf_decoder.columns import BlockColumnizer, blocksToColumns, flattenBlock, rowsToColumns
+
+
+def _mixedBlocks(n=200):
+    buf = bytearray()
+    for i in range(n):
+        tow = 100 * i
+        # absent sub-blocks in some epochs, the key layout never changes
+        buf += sbf.insNavGeod(tow, sub_blocks={1: (i, 2.0, 3.0)} if i % 3 else {})
+        buf += sbf.insNavCart(tow, sub_blocks={0: (0.1, 0.1, 0.2)} if i % 2 else {3: (1.0, 0.0, 0.0)})
+        sub_blocks = [(sbf.ACCELERATION, 0, (0.1, 0.2, i))]
+        if i % 4 == 0:
+            sub_blocks.append((sbf.ZERO_VELOCITY_FLAG, 0, (1.0,)))
+        if i % 5 == 0:
+            sub_blocks = []
+        buf += sbf.extSensorMeas(tow, sub_blocks=tuple(sub_blocks))
+        if i % 10 == 0:
+            buf += sbf.baseStation(tow, source=8 if i % 20 else 77)
+            # the DiffCorrIn keys depend on the mode
+            buf += sbf.diffCorrIn(tow, mode=i % 4)
+    return list(sbfBlocks(bytes(buf)))
+
+
+def _flattenedColumns(blocks):
+    rows = {}
+    for blockname, block_dict in blocks:
+        rows.setdefault(blockname, []).append(flattenBlock(blockname, block_dict))
+    return {blockname: rowsToColumns(block_rows) for blockname, block_rows in rows.items()}
+
+
+def test_columnizer_matches_flattened_rows():
+    blocks = _mixedBlocks()
+    expected = _flattenedColumns(blocks)
+    columns = blocksToColumns(blocks)
+
+    assert columns.keys() == expected.keys()
+    for blockname in expected:
+        assert set(columns[blockname]) == set(expected[blockname]), blockname
+        for key, values in expected[blockname].items():
+            assert columns[blockname][key].dtype == values.dtype, (blockname, key)
+            np.testing.assert_array_equal(columns[blockname][key], values, err_msg=f'{blockname} {key}')
+
+
+def test_absent_ins_sub_blocks_are_nan_columns():
+    blocks = list(sbfBlocks(sbf.insNavGeod(0) + sbf.insNavGeod(100, sub_blocks={1: (1.0, 2.0, 3.0)})))
+    columns = blocksToColumns(blocks)['INSNavGeod']
+
+    assert 'Attitude' not in columns
+    np.testing.assert_array_equal(columns['Attitude_0'], [np.nan, 1.0])
+    np.testing.assert_array_equal(columns['Attitude_2'], [np.nan, 3.0])
+    assert np.isnan(columns['Velocity_1']).all()
+
+
+def test_columnizer_fills_fields_missing_in_some_blocks():
+    columnizer = BlockColumnizer('Test')
+    columnizer.append({'TOW': 0, 'a': 1.5, 'name': 'x'})
+    columnizer.append({'TOW': 1, 'b': (1, 2)})
+    columnizer.append({'TOW': 2, 'a': 2.5, 'name': 'y'})
+    columns = columnizer.columns()
+
+    assert len(columnizer) == 3
+    np.testing.assert_array_equal(columns['TOW'], [0, 1, 2])
+    np.testing.assert_array_equal(columns['a'], [1.5, np.nan, 2.5])
+    np.testing.assert_array_equal(columns['name'], ['x', '', 'y'])
+    np.testing.assert_array_equal(columns['b_1'], [np.nan, 2, np.nan])
+
+    columnizer.clear()
+    columnizer.append({'TOW': 3})
+    assert list(columnizer.columns()) == ['TOW']
+
+
+def test_blocknames_filter():
+    columns = blocksToColumns(_mixedBlocks(20), blocknames={'INSNavGeod'})
+    assert list(columns) == ['INSNavGeod']
+    assert len(columns['INSNavGeod']['TOW']) == 20
+
+
+def test_ext_sensor_meas_sources_are_kept_apart():
+    block = sbf.extSensorMeas(0, sub_blocks=(
+        (sbf.ACCELERATION, 0, (1.0, 2.0, 3.0)),
+        (sbf.ACCELERATION, 1, (4.0, 5.0, 6.0)),
+        (sbf.ZERO_VELOCITY_FLAG, 0, (1.0,)),
+    ))
+    blockname, block_dict = next(sbfBlocks(block))
+    flat = flattenBlock(blockname, block_dict)
+
+    assert (flat['acc_x'], flat['acc_x_src1'], flat['acc_z_src1']) == (1.0, 4.0, 6.0)
+    assert flat['flag'] == 1.0
+    assert flat['acc_SensorModel'] == flat['acc_SensorModel_src1'] == 1
+    assert flat['zero_velocity_ObsInfo'] == 0
+
+    columns = blocksToColumns([(blockname, block_dict)])['ExtSensorMeas']
+    assert {key: values[0] for key, values in columns.items() if key in flat} == flat
+
+
+def test_text_and_numbers_in_one_column():
+    # RTCMDatum Datum is a datum code, or a text message for code 255
+    buf = sbf.rtcmDatum(0, datum=3) + sbf.rtcmDatum(100, datum=255) + sbf.rtcmDatum(200, datum=30)
+    columns = blocksToColumns(sbfBlocks(buf))['RTCMDatum']
+
+    assert columns['Datum'].dtype.kind == 'U'
+    np.testing.assert_array_equal(columns['Datum'], ['3', 'SourceCRS/TargetCRS pair is currently not used by the receiver', '30'])
+    np.testing.assert_array_equal(columns['SourceCRS'], ['ITRF2014'] * 3)
+    np.testing.assert_array_equal(columns['QualityInd_horizontal_0'], [1, 1, 1])
+
+    columns = rowsToColumns([{'a': 1}, {'b': 2}, {'a': 'x'}, {'a': 2.5}])
+    np.testing.assert_array_equal(columns['a'], ['1', '', 'x', '2.5'])
+    np.testing.assert_array_equal(columns['b'], [np.nan, 2, np.nan, np.nan])
@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import os
+import shutil
+import numpy as np
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.convert import convertFiles, findLogFiles, isUpToDate, logFileRoots, main, outputStems
+
+
+def _writeLog(path, n):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b''.join(sbf.insNavGeod(100 * i) for i in range(n)))
+
+
+def test_same_name_in_different_directories(tmp_path):
+    logs = tmp_path / 'logs'
+    _writeLog(str(logs / 'd1' / 'x.sbf'), 3)
+    _writeLog(str(logs / 'd2' / 'x.sbf'), 5)
+    out_dir = str(tmp_path / 'out')
+
+    roots = logFileRoots([str(logs / '**' / '*.sbf')])
+    files = findLogFiles([str(logs / '**' / '*.sbf')])
+    assert list(roots) == files and set(roots.values()) == {str(logs)}
+    assert outputStems(files, roots) == {files[0]: os.path.join('d1', 'x'), files[1]: os.path.join('d2', 'x')}
+
+    result = convertFiles(files, out_dir, workers=2, roots=roots, log=lambda msg: None)
+    assert sorted(result['converted']) == files and not result['failed']
+    for name, n in (('d1', 3), ('d2', 5)):
+        with np.load(os.path.join(out_dir, name, 'x_INSNavGeod.npz')) as npz:
+            assert len(npz['TOW']) == n
+        assert isUpToDate(os.path.join(logs, name, 'x.sbf'), out_dir, 'npz', os.path.join(name, 'x'))
+
+    result = convertFiles(files, out_dir, workers=2, roots=str(logs), log=lambda msg: None)
+    assert sorted(result['skipped']) == files
+
+    # no temporary files are left
+    assert sorted(os.listdir(os.path.join(out_dir, 'd1'))) == ['x.done.json', 'x_INSNavGeod.npz']
+
+
+def test_duplicate_stems_are_rejected(tmp_path):
+    files = [str(tmp_path / 'x.sbf'), str(tmp_path / 'x.log')]
+    with pytest.raises(ValueError):
+        outputStems(files)
+    with pytest.raises(ValueError):
+        convertFiles(files, str(tmp_path / 'out'), log=lambda msg: None)
+    # same name in different directories without a common root
+    files = [str(tmp_path / 'd1' / 'x.sbf'), str(tmp_path / 'd2' / 'x.sbf')]
+    with pytest.raises(ValueError):
+        outputStems(files)
+    assert outputStems(files, str(tmp_path)) == {files[0]: os.path.join('d1', 'x'), files[1]: os.path.join('d2', 'x')}
+    with pytest.raises(ValueError):
+        outputStems(files, str(tmp_path / 'd1'))
+
+
+def test_stems_do_not_depend_on_the_other_files(tmp_path):
+    logs = tmp_path / 'logs'
+    _writeLog(str(logs / 'd1' / 'x.sbf'), 3)
+    _writeLog(str(logs / 'd2' / 'y.sbf'), 4)
+    _writeLog(str(logs / 'd2' / 'sub' / 'z.sbf'), 5)
+    out_dir = str(tmp_path / 'out')
+    quiet = {'log': lambda msg: None}
+
+    # a directory argument: the file names
+    roots = logFileRoots([str(logs / 'd1')])
+    assert outputStems(list(roots), roots) == {str(logs / 'd1' / 'x.sbf'): 'x'}
+    result = convertFiles(list(roots), out_dir, workers=1, roots=roots, **quiet)
+    assert len(result['converted']) == 1
+    assert os.path.isfile(os.path.join(out_dir, 'x_INSNavGeod.npz'))
+
+    # more arguments keep the outputs of d1 in place
+    roots = logFileRoots([str(logs / 'd1'), str(logs / 'd2' / '**' / '*.sbf')])
+    assert outputStems(list(roots), roots) == {str(logs / 'd1' / 'x.sbf'): 'x',
+                                               str(logs / 'd2' / 'sub' / 'z.sbf'): os.path.join('sub', 'z'),
+                                               str(logs / 'd2' / 'y.sbf'): 'y'}
+    result = convertFiles(list(roots), out_dir, workers=1, roots=roots, **quiet)
+    assert result['skipped'] == [str(logs / 'd1' / 'x.sbf')] and len(result['converted']) == 2
+
+    # an explicit root for every argument
+    assert main([str(logs / 'd1'), str(logs / 'd2' / 'y.sbf'), '-o', out_dir, '-j', '1', '--root', str(logs)]) == 0
+    for stem in (os.path.join('d1', 'x'), os.path.join('d2', 'y')):
+        assert os.path.isfile(os.path.join(out_dir, stem + '.done.json'))
+
+
+def test_manifest_of_another_source_is_not_up_to_date(tmp_path):
+    _writeLog(str(tmp_path / 'a' / 'x.sbf'), 3)
+    out_dir = str(tmp_path / 'out')
+    convertFiles([str(tmp_path / 'a' / 'x.sbf')], out_dir, workers=1, log=lambda msg: None)
+    assert isUpToDate(str(tmp_path / 'a' / 'x.sbf'), out_dir, 'npz')
+
+    # same name, size and mtime but another file
+    os.makedirs(tmp_path / 'b')
+    shutil.copy2(tmp_path / 'a' / 'x.sbf', tmp_path / 'b' / 'x.sbf')
+    assert not isUpToDate(str(tmp_path / 'b' / 'x.sbf'), out_dir, 'npz')
+
+
+def test_other_block_selection_is_not_up_to_date(tmp_path):
+    filename = str(tmp_path / 'x.sbf')
+    with open(filename, 'wb') as f:
+        f.write(sbf.insNavGeod(0) + sbf.extSensorMeas(0))
+    out_dir = str(tmp_path / 'out')
+
+    result = convertFiles([filename], out_dir, workers=1, blocknames=['INSNavGeod'], log=lambda msg: None)
+    assert result['converted'] == [filename]
+    assert isUpToDate(filename, out_dir, 'npz', blocknames=['INSNavGeod'])
+    assert not isUpToDate(filename, out_dir, 'npz')
+    assert not isUpToDate(filename, out_dir, 'npz', blocknames=['INSNavGeod', 'ExtSensorMeas'])
+
+    # a run without -b exports all blocks
+    result = convertFiles([filename], out_dir, workers=1, log=lambda msg: None)
+    assert result['converted'] == [filename]
+    assert sorted(os.listdir(out_dir)) == ['x.done.json', 'x_ExtSensorMeas.npz', 'x_INSNavGeod.npz']
+    assert convertFiles([filename], out_dir, workers=1, log=lambda msg: None)['skipped'] == [filename]
@@ -0,0 +1,119 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import math
+import socket
+import threading
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.decimate import BlockDecimator, aggregateBlocks, TOW_DNU, WNC_DNU
+from sbf_decoder.reader import readSbfSocket
+from sbf_decoder.sbf_decoder import sbfBlocks
+
+INS_NAV_GEOD = 4226
+EXT_SENSOR_MEAS = 4050
+
+
+def _tows(blocks, blockname='INSNavGeod'):
+    return [block_dict['TOW'] for name, block_dict in blocks if name == blockname]
+
+
+def test_every_nth_block():
+    keep = BlockDecimator({'INSNavGeod': {'every': 3}})
+    assert [keep(INS_NAV_GEOD, 10 * i, 2200) for i in range(7)] == [True, False, False, True, False, False, True]
+    # do-not-use times are counted, too; other block types are always kept
+    assert [keep(INS_NAV_GEOD, TOW_DNU, WNC_DNU) for _ in range(3)] == [False, False, True]
+    assert all(keep(EXT_SENSOR_MEAS, TOW_DNU, 2200) for _ in range(5))
+
+
+def test_interval_is_aligned_to_gps_time():
+    keep = BlockDecimator({'INSNavGeod': {'interval': 0.5}})
+    tows = [250, 400, 499, 500, 980, 1010, 2600, 2700]
+    assert [tow for tow in tows if keep(INS_NAV_GEOD, tow, 2200)] == [250, 500, 1010, 2600]
+
+    # do-not-use times are dropped and do not start an interval
+    assert not keep(INS_NAV_GEOD, TOW_DNU, 2200)
+    assert not keep(INS_NAV_GEOD, 3000, WNC_DNU)
+    assert keep(INS_NAV_GEOD, 3000, 2200)
+
+    # the intervals continue over the week rollover
+    keep = BlockDecimator({'INSNavGeod': {'interval': 1}})
+    assert keep(INS_NAV_GEOD, 604799500, 2200)
+    assert keep(INS_NAV_GEOD, 0, 2201)
+    assert not keep(INS_NAV_GEOD, 999, 2201)
+
+
+@pytest.mark.parametrize('options', [
+    {'every': 0}, {'every': -2}, {'interval': 0}, {'interval': -0.1}, {'interval': 0.0004},
+])
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        BlockDecimator({'INSNavGeod': options})
+
+
+def test_unknown_block_name_is_rejected():
+    with pytest.raises(ValueError):
+        BlockDecimator({'NoSuchBlock': {'every': 2}})
+
+
+def test_keep_hook_of_the_decoders():
+    buf = b''.join(sbf.insNavGeod(100 * i) + sbf.extSensorMeas(100 * i) for i in range(10))
+    options = {'INSNavGeod': {'interval': 0.3}, 'ExtSensorMeas': {'every': 4}}
+
+    blocks = list(sbfBlocks(buf, keep=BlockDecimator(options)))
+    assert _tows(blocks) == [0, 300, 600, 900]
+    assert _tows(blocks, 'ExtSensorMeas') == [0, 400, 800]
+
+    sender, receiver = socket.socketpair()
+
+    def send():
+        with sender:
+            # split blocks over several packets
+            for i in range(0, len(buf), 37):
+                sender.sendall(buf[i:i + 37])
+
+    threading.Thread(target=send, daemon=True).start()
+    with receiver:
+        assert list(readSbfSocket(receiver, 64, keep=BlockDecimator(options))) == blocks
+
+
+def test_aggregation_windows():
+    blocks = [('INSNavGeod', sbf.insNavGeod(tow, sub_blocks={1: (value, 0.0, 0.0)}))
+              for tow, value in ((0, 1.0), (500, 2.0), (999, 6.0), (1000, 10.0), (1500, 20.0), (3000, 5.0))]
+    blocks = [block for _, buf in blocks for block in sbfBlocks(buf)]
+    blocks.insert(2, next(sbfBlocks(sbf.extSensorMeas(600))))
+
+    result = list(aggregateBlocks(blocks, {'INSNavGeod': (1.0, 'mean')}))
+
+    # other block types pass through, a window is complete once the next one starts
+    assert [name for name, _ in result] == ['ExtSensorMeas', 'INSNavGeod', 'INSNavGeod', 'INSNavGeod']
+    windows = [block_dict for name, block_dict in result if name == 'INSNavGeod']
+    assert [(w['TOW'], w['WNc'], w['count']) for w in windows] == [(0, 2200, 3), (1000, 2200, 2), (3000, 2200, 1)]
+    assert [w['Attitude_0'] for w in windows] == [3.0, 15.0, 5.0]
+    # text and nan only fields keep their last value
+    assert windows[0]['Datum'] == 'WGS84/ITRS'
+    assert math.isnan(windows[0]['Velocity_0'])
+    # ts in milliseconds
+    assert windows[1]['ts'] - windows[0]['ts'] == pytest.approx(1000.0)
+
+
+def test_several_aggregations():
+    buf = b''.join(sbf.insNavGeod(tow, sub_blocks={1: (value, 0.0, 0.0)})
+                   for tow, value in ((0, 4.0), (100, 1.0), (200, 7.0), (250, 2.0)))
+
+    (name, window), = aggregateBlocks(sbfBlocks(buf), {'INSNavGeod': (0.5, ('mean', 'min', 'max', 'last'))})
+
+    assert name == 'INSNavGeod' and window['count'] == 4
+    assert (window['Attitude_0_mean'], window['Attitude_0_min'],
+            window['Attitude_0_max'], window['Attitude_0_last']) == (3.5, 1.0, 7.0, 2.0)
+    assert 'Attitude_0' not in window
+    assert window['Datum'] == 'WGS84/ITRS'
+
+
+@pytest.mark.parametrize('windows', [{'INSNavGeod': (1.0, 'median')}, {'INSNavGeod': (0, 'mean')}])
+def test_invalid_aggregations_are_rejected(windows):
+    with pytest.raises(ValueError):
+        list(aggregateBlocks([], windows))
@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import csv
+import numpy as np
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.sbf_decoder import sbfBlocks
+from sbf_decoder.columns import blocksToColumns
+from sbf_decoder.export import exportBlocks, exportSbfLogFile
+
+# 2 rows per chunk: the dtypes differ between the chunks
+PROMOTION_BLOCKS = [
+    ('Test', {'TOW': 0, 'a': 1, 'name': 'x', 'mixed': 1}),
+    ('Test', {'TOW': 1, 'a': 2, 'name': 'y', 'mixed': 2}),
+    ('Test', {'TOW': 2, 'a': 2.5, 'name': 'long name', 'mixed': 'text', 'late': 7}),
+    ('Test', {'TOW': 3, 'a': 3.5, 'name': 'z', 'mixed': 'more'}),
+    ('Test', {'TOW': 4, 'a': 4, 'name': 'w', 'mixed': 5}),
+]
+
+
+def test_npz_dtype_promotion(tmp_path):
+    outputs = exportBlocks(PROMOTION_BLOCKS, tmp_path, fmt='npz', chunk_size=2)
+
+    with np.load(outputs['Test']) as npz:
+        np.testing.assert_array_equal(npz['TOW'], [0, 1, 2, 3, 4])
+        assert npz['TOW'].dtype == np.int64
+        # int and float chunks
+        np.testing.assert_array_equal(npz['a'], [1.0, 2.0, 2.5, 3.5, 4.0])
+        assert npz['a'].dtype == np.float64
+        # text widened to the longest chunk
+        np.testing.assert_array_equal(npz['name'], ['x', 'y', 'long name', 'z', 'w'])
+        # int and text chunks can't be promoted, stored as text
+        np.testing.assert_array_equal(npz['mixed'], ['1', '2', 'text', 'more', '5'])
+        # int column missing in other chunks is filled with nan
+        np.testing.assert_array_equal(npz['late'], [np.nan, np.nan, 7, np.nan, np.nan])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 50])
+def test_promotion_does_not_depend_on_chunk_size(tmp_path, chunk_size):
+    outputs = exportBlocks(PROMOTION_BLOCKS, tmp_path, fmt='npz', chunk_size=chunk_size)
+
+    with np.load(outputs['Test']) as npz:
+        np.testing.assert_array_equal(npz['a'], [1.0, 2.0, 2.5, 3.5, 4.0])
+        np.testing.assert_array_equal(npz['mixed'], ['1', '2', 'text', 'more', '5'])
+        np.testing.assert_array_equal(npz['late'], [np.nan, np.nan, 7, np.nan, np.nan])
+
+
+def test_csv_dtype_promotion(tmp_path):
+    outputs = exportBlocks(PROMOTION_BLOCKS, tmp_path, fmt='csv', chunk_size=2)
+
+    with open(outputs['Test'], newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['TOW', 'a', 'name', 'mixed', 'late']
+    assert rows[3] == ['2', '2.5', 'long name', 'text', '7.0']
+    assert rows[1][4] == 'nan'
+
+
+def test_h5_dtype_promotion(tmp_path):
+    h5py = pytest.importorskip('h5py')
+    outputs = exportBlocks(PROMOTION_BLOCKS, tmp_path, fmt='h5', chunk_size=2)
+
+    with h5py.File(outputs['Test'], 'r') as h5:
+        np.testing.assert_array_equal(h5['a'][:], [1.0, 2.0, 2.5, 3.5, 4.0])
+        assert h5['name'][2] == b'long name'
+
+
+def test_export_log_file_matches_columns(tmp_path):
+    buf = b''.join(sbf.insNavGeod(100 * i, sub_blocks={1: (i, 0.0, 0.0)} if i % 3 else {}) +
+                   sbf.extSensorMeas(100 * i) for i in range(25))
+    log = tmp_path / 'log.sbf'
+    log.write_bytes(buf)
+
+    outputs = exportSbfLogFile(str(log), tmp_path / 'out', chunk_size=7)
+    expected = blocksToColumns(sbfBlocks(buf))
+
+    assert set(outputs) == {'INSNavGeod', 'ExtSensorMeas'}
+    for blockname, path in outputs.items():
+        assert path.endswith(f'log_{blockname}.npz')
+        with np.load(path) as npz:
+            assert set(npz.files) == set(expected[blockname])
+            for key, values in expected[blockname].items():
+                np.testing.assert_array_equal(npz[key], values, err_msg=f'{blockname} {key}')
+
+    # only the outputs are left
+    assert sorted(p.name for p in (tmp_path / 'out').iterdir()) == ['log_ExtSensorMeas.npz', 'log_INSNavGeod.npz']
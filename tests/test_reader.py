@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import random
+import socket
+import struct
+import threading
+import sbf_samples as sbf
+from sbf_decoder.sbf_decoder import crc_ccitt, sbfBlocks, sbfDecoder
+from sbf_decoder.reader import readSbfLogFile, readSbfSocket
+
+
+def _bitLoopCrc(data, size, initial_value):
+    """ the former bit by bit CRC-CCITT """
+    crc = initial_value
+    for i in range(size):
+        crc ^= (data[i] << 8)
+        for j in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ 0x1021
+            else:
+                crc <<= 1
+            crc &= 0xFFFF
+    return crc
+
+
+def _blocks(n=50):
+    return [sbf.insNavGeod(100 * i, sub_blocks={1: (i, 0.0, 0.0)}) if i % 2 else
+            sbf.extSensorMeas(100 * i) for i in range(n)]
+
+
+def _tows(decoded):
+    return [block_dict['TOW'] for _, block_dict in decoded]
+
+
+def test_crc_matches_bit_loop():
+    rng = random.Random(0)
+    for size in (0, 1, 2, 7, 64, 333):
+        data = bytes(rng.randrange(256) for _ in range(size))
+        for initial_value in (0, 0x1d0f, 0xffff):
+            assert crc_ccitt(data, size, initial_value) == _bitLoopCrc(data, size, initial_value)
+
+    # chained over header and body as in sbfDecoder
+    block = sbf.insNavGeod(0)
+    assert crc_ccitt(block[8:], len(block) - 8, _bitLoopCrc(block[4:8], 4, 0)) == struct.unpack_from('<H', block, 2)[0]
+
+
+def test_decoders_agree():
+    buf = b''.join(_blocks())
+    assert _tows(sbfBlocks(buf)) == _tows(sbfDecoder(buf)) == [100 * i for i in range(50)]
+
+
+def test_resync_after_garbage_and_corrupted_blocks():
+    blocks = _blocks(10)
+    corrupted = bytearray(blocks[3])
+    corrupted[20] ^= 0xff
+    # a false sync announcing a block longer than the rest of the buffer
+    false_sync = b'$@' + struct.pack('<HHH', 0, 4226, 4000)
+    buf = b'junk$' + blocks[0] + b'$@\x00' + blocks[1] + blocks[2] + bytes(corrupted) + false_sync \
+        + b''.join(blocks[4:]) + b'$@'
+
+    assert _tows(sbfBlocks(buf)) == [100 * i for i in range(10) if i != 3]
+
+
+def test_log_file(tmp_path):
+    path = tmp_path / 'log.sbf'
+    path.write_bytes(b''.join(_blocks()))
+    assert _tows(readSbfLogFile(path)) == [100 * i for i in range(50)]
+
+    # keep is called with the block number, TOW and WNc before parsing
+    calls = []
+    kept = list(readSbfLogFile(path, keep=lambda *args: calls.append(args) or args[0] == 4226))
+    assert len(calls) == 50 and calls[1] == (4226, 100, 2200)
+    assert {blockname for blockname, _ in kept} == {'INSNavGeod'}
+
+
+def test_empty_log_file(tmp_path):
+    path = tmp_path / 'empty.sbf'
+    path.write_bytes(b'')
+    assert list(readSbfLogFile(path)) == []
+
+
+def test_blocks_split_over_recv_calls():
+    data = b'\x00\x01' + b''.join(_blocks()) + b'$@\x12'
+    a, b = socket.socketpair()
+
+    def send():
+        # odd packet sizes split the blocks anywhere, also inside the header
+        with a:
+            rng = random.Random(1)
+            pos = 0
+            while pos < len(data):
+                size = rng.choice((1, 3, 7, 50, 301))
+                a.sendall(data[pos:pos + size])
+                pos += size
+
+    sender = threading.Thread(target=send)
+    sender.start()
+    with b:
+        decoded = list(readSbfSocket(b, bufsize=13))
+    sender.join()
+
+    assert _tows(decoded) == [100 * i for i in range(50)]
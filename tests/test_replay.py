@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 1:41 PM
+'''
+
+import socket
+import threading
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.reader import readSbfDataStream
+from sbf_decoder.replay import main, replayPackets, sendPackets, serveReplay
+
+RECORDING = b''.join(sbf.insNavGeod(100 * i) for i in range(20))
+
+
+def _replay(speed, packet_size):
+    server = socket.create_server(('127.0.0.1', 0))
+    logs = []
+    replay = threading.Thread(target=serveReplay, args=(server, RECORDING),
+                              kwargs={'speed': speed, 'packet_size': packet_size, 'log': logs.append})
+    replay.start()
+    with server:
+        decoded = list(readSbfDataStream(*server.getsockname()))
+        replay.join()
+    return decoded, logs
+
+
+def test_packet_times_follow_tow():
+    packets = list(replayPackets(RECORDING, speed=10.0))
+    assert [t for t, _, _ in packets] == pytest.approx([0.01 * i for i in range(20)])
+    assert b''.join(packet for _, packet, _ in packets) == RECORDING
+
+    # max rate: no send times
+    assert {t for t, _, _ in replayPackets(RECORDING, speed=0)} == {0.0}
+
+
+def test_max_rate_replay_reports_no_lag():
+    decoded, logs = _replay(speed=0, packet_size=100)
+    assert [block_dict['TOW'] for _, block_dict in decoded] == [100 * i for i in range(20)]
+    assert 'max lag n/a' in logs[0]
+
+
+def test_paced_replay_reports_lag():
+    decoded, logs = _replay(speed=100.0, packet_size=None)
+    assert len(decoded) == 20
+    assert 'max lag n/a' not in logs[0] and ' ms)' in logs[0]
+
+
+class _Client:
+    """ accepted connection whose send fails after a number of packets """
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.received = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def sendall(self, packet):
+        if len(self.received) == self.fail_after:
+            raise ConnectionResetError('client closed')
+        self.received.append(packet)
+
+
+class _Server:
+    def __init__(self, clients):
+        self.clients = list(clients)
+
+    def accept(self):
+        return self.clients.pop(0), ('127.0.0.1', 1)
+
+
+@pytest.mark.parametrize('packet_size', [0, -5])
+def test_packet_size_must_be_positive(packet_size):
+    with pytest.raises(ValueError):
+        replayPackets(RECORDING, packet_size=packet_size)
+    with pytest.raises(SystemExit):
+        main(['x.sbf', '--packet-size', str(packet_size)])
+
+
+def test_unsent_packet_goes_to_the_next_client():
+    packets = replayPackets(RECORDING, speed=0, packet_size=100)
+    stats, reason, unsent = sendPackets(_Client(fail_after=3), packets, paced=False)
+    assert reason == 'client closed' and stats['packets'] == 3
+    assert unsent[1] == RECORDING[300:400]
+
+    clients = [_Client(fail_after=2), _Client(fail_after=0), _Client(fail_after=5), _Client()]
+    all_stats = serveReplay(_Server(clients), RECORDING, speed=0, packet_size=100, log=lambda msg: None)
+
+    assert b''.join(packet for client in clients for packet in client.received) == RECORDING
+    assert [stats['packets'] for stats in all_stats] == [2, 0, 5, len(RECORDING) // 100 - 7 + 1]
@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+import sbf_samples as sbf
+from sbf_decoder.sbf_decoder import sbfBlocks
+from sbf_decoder.store import RingBuffer, RingStore
+
+SCHEMA = {'ts': np.float64, 'TOW': np.int64, 'WNc': np.int64, 'x': np.float32, 'name': 'U8'}
+
+
+def _row(ts, **fields):
+    return {'ts': float(ts), 'TOW': int(ts), 'WNc': 2200, 'x': ts / 10, **fields}
+
+
+def test_wrap_around_keeps_the_newest_rows():
+    buffer = RingBuffer(SCHEMA, capacity=5)
+    for ts in range(12):
+        assert buffer.append(_row(ts))
+
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(buffer.snapshot()['ts'], [7, 8, 9, 10, 11])
+    np.testing.assert_array_equal(buffer.latest(3, columns=['TOW'])['TOW'], [9, 10, 11])
+    assert list(buffer.latest(3, columns=['TOW'])) == ['TOW']
+    np.testing.assert_array_equal(buffer.latest(100)['ts'], [7, 8, 9, 10, 11])
+    # missing fields are filled
+    np.testing.assert_array_equal(buffer.snapshot()['name'], [''] * 5)
+
+
+def test_range_over_both_segments():
+    buffer = RingBuffer(SCHEMA, capacity=5)
+    for ts in range(0, 80, 10):
+        buffer.append(_row(ts))
+    # rows 30..70, stored as [50, 60, 70, 30, 40]
+    assert buffer.head == 3
+
+    np.testing.assert_array_equal(buffer.range(35, 65)['ts'], [40, 50, 60])
+    np.testing.assert_array_equal(buffer.range(30, 70)['ts'], [30, 40, 50, 60, 70])
+    np.testing.assert_array_equal(buffer.range(45, 45)['ts'], [])
+    np.testing.assert_array_equal(buffer.range(0, 25)['ts'], [])
+    assert buffer.range(0, 25)['name'].dtype == np.dtype('U8')
+
+
+def test_out_of_order_and_dnu_rows_are_skipped():
+    buffer = RingBuffer(SCHEMA, capacity=10)
+    assert buffer.append(_row(10))
+    assert not buffer.append(_row(5))
+    # equal ts is allowed
+    assert buffer.append(_row(10, name='same'))
+    assert not buffer.append(_row(4e13, TOW=4294967295))
+    assert not buffer.append(_row(20, WNc=65535))
+    assert not buffer.append({'TOW': 1})
+    assert not buffer.append({**_row(20), 'ts': float('nan')})
+    assert buffer.append(_row(30))
+
+    assert buffer.skipped == 5
+    np.testing.assert_array_equal(buffer.snapshot()['ts'], [10, 10, 30])
+    np.testing.assert_array_equal(buffer.range(0, 1e14)['ts'], [10, 10, 30])
+
+
+def test_store_consumes_decoded_blocks():
+    buf = b''.join(sbf.insNavGeod(100 * i, sub_blocks={1: (i, 0.0, 0.0)}) + sbf.extSensorMeas(100 * i)
+                   for i in range(10))
+    # a late block and a do-not-use TOW
+    buf += sbf.insNavGeod(50) + sbf.insNavGeod(4294967295) + sbf.diffCorrIn(0)
+
+    store = RingStore(capacities={'INSNavGeod': 4})
+    assert store.consume(sbfBlocks(buf)) == 20
+    assert store.buffers['INSNavGeod'].skipped == 2
+
+    geod = store.snapshot('INSNavGeod')
+    np.testing.assert_array_equal(geod['TOW'], [600, 700, 800, 900])
+    np.testing.assert_array_equal(geod['Attitude_0'], [6, 7, 8, 9])
+    assert np.isnan(geod['Velocity_0']).all()
+
+    t0 = store.latest('ExtSensorMeas', 1)['ts'][0] - 900
+    np.testing.assert_array_equal(store.range('ExtSensorMeas', t0 + 150, t0 + 450)['TOW'], [200, 300, 400])
@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+'''
+@Author  ：Jiangtao Shuai
+@Date    ：03/04/2023 12:05 PM
+'''
+
+import numpy as np
+import pytest
+import sbf_samples as sbf
+from sbf_decoder.columns import blocksToColumns
+from sbf_decoder.sbf_decoder import sbfBlocks
+from sbf_decoder.transforms import (ELLIPSOIDS, baseStationBaselines, ecef2Enu, ecef2Geodetic, enu2Ecef,
+                                    geodetic2Ecef, insNavCartGeodetic)
+
+A = ELLIPSOIDS['WGS84'][0]
+BASE = (4177000.0, 855000.0, 4727000.0)
+
+
+@pytest.mark.parametrize('datum', ['WGS84/ITRS', 'ETRS89 (ETRF2000 realization)', 'GRS80'])
+def test_geodetic_round_trip(datum):
+    latitude, longitude = np.meshgrid(np.linspace(-90, 90, 37), np.linspace(-180, 175, 72))
+    height = np.resize([-100.0, 0.0, 520.0, 8848.0, 20200e3], latitude.shape)
+
+    lat, lon, h = ecef2Geodetic(*geodetic2Ecef(latitude, longitude, height, datum), datum)
+
+    np.testing.assert_allclose(lat, latitude, rtol=0, atol=1e-13)
+    np.testing.assert_allclose(h, height, rtol=0, atol=1e-8)
+    # the longitude is undefined at the poles
+    inner = np.abs(latitude) < 90
+    np.testing.assert_allclose(lon[inner], longitude[inner], rtol=0, atol=1e-12)
+
+
+def test_unknown_datum_is_rejected():
+    with pytest.raises(ValueError):
+        geodetic2Ecef(0.0, 0.0, 0.0, 'UNKNOW COORDINATES')
+
+
+def test_enu_known_values_and_inverse():
+    # equator / greenwich: east = y, north = z, up = x
+    east, north, up = ecef2Enu([A + 5, A, A], [0, 10, 0], [0, 0, 20], A, 0.0, 0.0)
+    np.testing.assert_allclose(east, [0, 10, 0], atol=1e-9)
+    np.testing.assert_allclose(north, [0, 0, 20], atol=1e-9)
+    np.testing.assert_allclose(up, [5, 0, 0], atol=1e-9)
+
+    # equator / 90° east: east = -x, north = z, up = y
+    east, north, up = ecef2Enu(-3.0, A + 4, 2.0, 0.0, A, 0.0)
+    np.testing.assert_allclose([east, north, up], [3, 2, 4], atol=1e-9)
+
+    # a point 100 m above the base station
+    lat, lon, h = ecef2Geodetic(*BASE)
+    x, y, z = geodetic2Ecef(lat, lon, h + 100)
+    np.testing.assert_allclose(ecef2Enu(x, y, z, *BASE), [0, 0, 100], atol=1e-7)
+
+    rng = np.random.default_rng(1)
+    enu = rng.uniform(-1e4, 1e4, (3, 50))
+    xyz = enu2Ecef(*enu, *BASE)
+    np.testing.assert_allclose(ecef2Enu(*xyz, *BASE), enu, rtol=0, atol=1e-8)
+
+
+def test_ins_nav_cart_with_mixed_datums():
+    points = [(48.1, 11.5, 520.0), (-33.9, 151.2, 40.0), (0.0, 0.0, 0.0)]
+    # 7 is not a known datum and decoded as "UNKNOW COORDINATES"
+    datums = [(0, 'WGS84/ITRS'), (30, 'ETRS89 (ETRF2000 realization)'), (7, 'WGS84/ITRS')]
+    buf = b''
+    for i, (point, (datum, name)) in enumerate(zip(points, datums)):
+        buf += sbf.insNavCart(100 * i, pos=tuple(geodetic2Ecef(*point, name)), datum=datum)
+    columns = blocksToColumns(sbfBlocks(buf))['INSNavCart']
+    assert list(columns['Datum']) == ['WGS84/ITRS', 'ETRS89 (ETRF2000 realization)', 'UNKNOW COORDINATES']
+
+    latitude, longitude, height = insNavCartGeodetic(columns)
+    np.testing.assert_allclose(latitude[:2], [48.1, -33.9], atol=1e-9)
+    np.testing.assert_allclose(longitude[:2], [11.5, 151.2], atol=1e-9)
+    np.testing.assert_allclose(height[:2], [520.0, 40.0], atol=1e-6)
+    assert np.isnan([latitude[2], longitude[2], height[2]]).all()
+
+    # without a Datum column WGS84 is used
+    del columns['Datum']
+    np.testing.assert_allclose(insNavCartGeodetic(columns)[0], [48.1, -33.9, 0.0], atol=1e-7)
+
+
+def test_base_station_baselines():
+    lat, lon, h = ecef2Geodetic(*BASE)
+    above = tuple(geodetic2Ecef(lat, lon, h + 10))
+    other_base = tuple(geodetic2Ecef(lat, lon, h + 4))
+    buf = (sbf.insNavCart(0, pos=above) + sbf.baseStation(50, station_id=7, xyz=BASE)
+           + sbf.insNavCart(100, pos=above) + sbf.insNavCart(200, pos=BASE)
+           + sbf.baseStation(250, station_id=9, xyz=other_base) + sbf.insNavCart(300, pos=above))
+
+    baselines = baseStationBaselines(sbfBlocks(buf))
+
+    np.testing.assert_array_equal(baselines['TOW'], [0, 100, 200, 300])
+    np.testing.assert_array_equal(baselines['WNc'], [2200] * 4)
+    np.testing.assert_array_equal(baselines['BaseStationID'], [-1, 7, 7, 9])
+    assert baselines['ts'].shape == (4,)
+    # no base station before the first position
+    assert np.isnan([baselines[k][0] for k in ('east', 'north', 'up')]).all()
+    np.testing.assert_allclose(baselines['east'][1:], 0, atol=1e-7)
+    np.testing.assert_allclose(baselines['north'][1:], 0, atol=1e-7)
+    np.testing.assert_allclose(baselines['up'][1:], [10, 0, 6], atol=1e-7)
+
+    empty = baseStationBaselines(sbfBlocks(sbf.baseStation(0)))
+    assert all(values.size == 0 for values in empty.values())